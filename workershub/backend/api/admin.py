@@ -1,15 +1,35 @@
+import re
+
 from django.contrib import admin
+from django.db.models import Q
+
 from .models import Worker, BookingRequest
+from .pagination import EstimatedCountPaginator
+from .search import get_search_backend
+
+
+class ScalableChangeListMixin:
+    """Changelists whose cost does not grow with the table.
+
+    The row count comes from planner estimates instead of ``COUNT(*)``, the
+    unfiltered total is not counted at all, and list_filter facet counts are
+    never computed.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
 
 
 @admin.register(Worker)
-class WorkerAdmin(admin.ModelAdmin):
+class WorkerAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ['name', 'profession', 'nationality', 'age', 'status', 'created_at']
     list_filter = ['profession', 'nationality', 'status', 'religion', 'marital_status', 'created_at']
-    search_fields = ['name', 'passport_number', 'nationality', 'profession']
+    # Served by get_search_results rather than icontains scans
+    search_fields = ['name', '=passport_number']
     readonly_fields = ['created_at']
     list_editable = ['status']
     list_per_page = 20
+    passport_pattern = re.compile(r'[A-Z0-9]{5,20}')
     
     fieldsets = (
         ('Basic Information', {
@@ -30,12 +50,25 @@ class WorkerAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Full-text matches from the search backend plus an exact, indexed passport lookup"""
+        terms = search_term.split()
+        if not terms:
+            return queryset, False
+        condition = Q(pk__in=get_search_backend(queryset.db).search(queryset, terms).values('pk'))
+        passport = search_term.strip().upper()
+        if self.passport_pattern.fullmatch(passport):
+            condition |= Q(passport_number=passport)
+        return queryset.filter(condition), False
+
 
 @admin.register(BookingRequest)
-class BookingRequestAdmin(admin.ModelAdmin):
+class BookingRequestAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ['full_name', 'worker', 'status', 'phone_number', 'created_at']
     list_filter = ['status', 'created_at', 'worker__profession', 'worker__nationality']
     search_fields = ['full_name', 'phone_number', 'email', 'worker__name']
+    # Workers are picked through WorkerAdmin's search instead of a <select> of every worker
+    autocomplete_fields = ['worker']
     readonly_fields = ['created_at', 'updated_at']
     list_editable = ['status']
     list_per_page = 20
@@ -0,0 +1,118 @@
+"""
+Async versions of the public read endpoints, for deployments served over ASGI.
+
+The views reuse the filtering, pagination and serializers of their sync
+counterparts in ``api.views`` but read through Django's async ORM, so a
+request waiting on the database does not hold a thread from the sync pool.
+``api.urls`` routes to them when ``settings.ASYNC_READ_VIEWS`` is on; the
+class and function names match ``api.views`` so either module can be used.
+
+Query budgets are not enforced here: ``QueryCounter`` wraps the connection of
+the current thread, and async ORM calls run on another one.
+"""
+import inspect
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import views
+from .stats import aget_worker_stats, aget_booking_stats
+
+
+class AsyncAPIViewMixin:
+    """Drive a DRF view with an async ``dispatch`` so its handlers can be coroutines"""
+
+    def perform_authentication(self, request):
+        # Authentication stays lazy as these endpoints allow anyone; resolving
+        # request.user here would load the session synchronously
+        pass
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aserialize(self, instance, many=False):
+        # Serializers only read loaded columns, so this never touches the database
+        return self.get_serializer(instance, many=many).data
+
+
+class WorkerListView(AsyncAPIViewMixin, views.WorkerListView):
+    async def get(self, request, *args, **kwargs):
+        return await self.aget_cached(request, self.alist, *args, **kwargs)
+
+    async def apage(self, queryset):
+        """``(rows, paginated)`` for ``queryset``, fetched with the async ORM"""
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+            if page is not None:
+                return page, True
+        return [row async for row in queryset], False
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast = self.get_fast_representation()
+        if fast is not None:
+            rows, paginated = await self.apage(fast.values(queryset))
+            data = fast.represent(rows)
+        else:
+            rows, paginated = await self.apage(queryset)
+            data = await self.aserialize(rows, many=True)
+        return self.get_paginated_response(data) if paginated else Response(data)
+
+
+class WorkerDetailView(AsyncAPIViewMixin, views.WorkerDetailView):
+    async def get(self, request, *args, **kwargs):
+        return await self.aget_cached(request, self.aretrieve, *args, **kwargs)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(await self.aserialize(await self.aget_object()))
+
+
+class WorkerStatsView(AsyncAPIViewMixin, APIView):
+    """Get worker statistics for dashboard"""
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        return Response(await aget_worker_stats())
+
+
+class BookingStatsView(AsyncAPIViewMixin, APIView):
+    """Get booking request statistics"""
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        return Response(await aget_booking_stats())
+
+
+worker_stats = WorkerStatsView.as_view()
+booking_stats = BookingStatsView.as_view()
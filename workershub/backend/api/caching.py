@@ -0,0 +1,136 @@
+"""
+Response caching and conditional GET for read endpoints.
+
+Each model has a version stamp in the cache that the signals in
+``api.signals`` replace whenever a row is saved or deleted. A cached response
+is keyed on the request's normalized query parameters plus the version stamps
+of the models it was built from, so a write makes every dependent entry
+unreachable without having to find and delete them. The same key doubles as a
+strong ETag, and the newest stamp's timestamp is sent as Last-Modified.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .routers import reading_from_replica
+
+
+def _version_key(model):
+    return f'api:version:{model._meta.label_lower}'
+
+
+def get_model_version(model):
+    """Return ``(token, modified timestamp)`` for ``model``, starting a new one if the cache is cold"""
+    version = cache.get(_version_key(model))
+    if version is None:
+        version = bump_model_version(model)
+    return version
+
+
+async def aget_model_version(model):
+    version = await cache.aget(_version_key(model))
+    if version is None:
+        version = (uuid.uuid4().hex, int(time.time()))
+        await cache.aset(_version_key(model), version, None)
+    return version
+
+
+def bump_model_version(model):
+    version = (uuid.uuid4().hex, int(time.time()))
+    cache.set(_version_key(model), version, None)
+    return version
+
+
+def normalized_query(request, ignored=()):
+    """Query parameters sorted by name and value, so equivalent URLs share a key"""
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(params) if key not in ignored
+        for value in sorted(params.getlist(key))
+    )
+
+
+class ConditionalCacheMixin:
+    """Cache rendered GET responses and answer conditional requests with 304.
+
+    ``cache_models`` lists the models the response is built from; a save or
+    delete on any of them moves the ETag and misses the cache. Query
+    parameters in ``cache_ignored_params`` do not affect the response and are
+    left out of the key.
+    """
+    cache_models = ()
+    cache_ignored_params = ()
+    response_cache_timeout = None
+
+    def get_cache_key(self, request, versions):
+        parts = [
+            type(self).__name__,
+            request.scheme,
+            request.get_host(),
+            request.path,
+            normalized_query(request, self.cache_ignored_params),
+            request.accepted_renderer.format,
+        ] + [token for token, _ in versions]
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        versions = [get_model_version(model) for model in self.cache_models]
+        key = self.get_cache_key(request, versions)
+        response = self.conditional_response(request, key, versions)
+        if response is None:
+            response = self.cached_response(cache.get(f'api:response:{key}'))
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            self.cache_on_render(key, response, versions)
+        return self.add_validators(response, key, versions)
+
+    async def aget_cached(self, request, handler, *args, **kwargs):
+        """``get`` for async views; ``handler`` is awaited to build the response on a miss"""
+        versions = [await aget_model_version(model) for model in self.cache_models]
+        key = self.get_cache_key(request, versions)
+        response = self.conditional_response(request, key, versions)
+        if response is None:
+            response = self.cached_response(await cache.aget(f'api:response:{key}'))
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            self.cache_on_render(key, response, versions)
+        return self.add_validators(response, key, versions)
+
+    def conditional_response(self, request, key, versions):
+        last_modified = max((modified for _, modified in versions), default=None)
+        return get_conditional_response(request, etag=f'"{key}"', last_modified=last_modified)
+
+    def cached_response(self, cached):
+        if cached is None:
+            return None
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def cache_on_render(self, key, response, versions):
+        if response.status_code != 200:
+            return
+        newest = max((modified for _, modified in versions), default=0)
+        if reading_from_replica() and time.time() - newest < settings.REPLICA_STICKY_SECONDS:
+            # The replica may not have the write that moved the version yet
+            return
+        response.add_post_render_callback(lambda rendered: self.store_response(key, rendered))
+
+    def add_validators(self, response, key, versions):
+        response['ETag'] = f'"{key}"'
+        last_modified = max((modified for _, modified in versions), default=None)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def store_response(self, key, response):
+        timeout = self.response_cache_timeout
+        if timeout is None:
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+        cache.set(f'api:response:{key}', (response.content, response['Content-Type']), timeout)
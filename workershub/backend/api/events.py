@@ -0,0 +1,175 @@
+"""
+Publish/subscribe for worker and booking status changes.
+
+``api.signals`` and ``api.transitions`` publish an event once a status change
+commits, and ``api.streams`` relays the events to Server-Sent Events clients.
+The broker class is named by ``settings.EVENT_BROKER``. ``InProcessBroker``
+only reaches subscribers in its own process, which suits a single ASGI worker,
+local development and tests; a deployment running several processes points
+the setting at a class with the same interface backed by a shared broker.
+
+Every subscriber reads from a bounded queue. One that falls more than
+``EVENT_STREAM_QUEUE_SIZE`` events behind is dropped instead of letting its
+queue grow, and its stream tells the client to resync from the change feed.
+"""
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+WORKER_STATUS = 'worker.status'
+BOOKING_STATUS = 'booking.status'
+
+
+def worker_event(worker, previous):
+    return {
+        'type': WORKER_STATUS,
+        'worker': worker.pk,
+        'status': worker.status,
+        'previous': previous,
+        'profession': worker.profession,
+        'nationality': worker.nationality,
+    }
+
+
+def booking_event(booking_id, worker, status, previous):
+    return {
+        'type': BOOKING_STATUS,
+        'booking': booking_id,
+        'worker': worker.pk,
+        'status': status,
+        'previous': previous,
+        'profession': worker.profession,
+        'nationality': worker.nationality,
+    }
+
+
+class Subscription:
+    """Events matching ``filters``, a dict of event key to the set of accepted values"""
+
+    def __init__(self, broker, filters, maxsize):
+        self.broker = broker
+        self.filters = filters
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def matches(self, event):
+        return all(event.get(key) in accepted for key, accepted in self.filters.items())
+
+    def offer(self, event):
+        """Queue ``event``; must run on the subscriber's event loop"""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.drop()
+
+    def drop(self):
+        """Stop delivering and make the reader's next ``get()`` return None"""
+        self.dropped = True
+        self.broker.unsubscribe(self)
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self):
+        """The next event, or None once this subscriber has been dropped"""
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan events out to the subscribers of this process.
+
+    Events get increasing ids and the last ``EVENT_REPLAY_SIZE`` are kept, so
+    a client reconnecting with ``Last-Event-ID`` receives what it missed, or
+    is told to resync when that is no longer available.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.ids = itertools.count(1)
+        self.last_id = 0
+        self.recent = deque(maxlen=settings.EVENT_REPLAY_SIZE)
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, event):
+        with self.lock:
+            self.last_id = next(self.ids)
+            event = {'id': self.last_id, **event}
+            self.recent.append(event)
+            subscribers = [subscription for subscription in self.subscribers if subscription.matches(event)]
+        for subscription in subscribers:
+            try:
+                # Publishers run on request threads; queues belong to the subscribers' loops
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+        return event
+
+    def discard(self):
+        """Account for an event nobody was listening to without building it"""
+        with self.lock:
+            self.last_id = next(self.ids)
+            self.recent.clear()
+
+    def subscribe(self, filters, last_event_id=None):
+        """Subscribe the calling event loop, replaying retained events after ``last_event_id``"""
+        subscription = Subscription(self, filters, settings.EVENT_STREAM_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(subscription)
+            if last_event_id is None or last_event_id == self.last_id:
+                return subscription
+            oldest = self.recent[0]['id'] if self.recent else self.last_id + 1
+            missed = [event for event in self.recent if event['id'] > last_event_id]
+            replayable = oldest <= last_event_id + 1 <= self.last_id
+        if not replayable:
+            subscription.drop()
+            return subscription
+        for event in missed:
+            if subscription.matches(event):
+                subscription.offer(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+def publish_on_commit(events, using=None):
+    """Publish ``events`` once the current transaction commits.
+
+    ``events`` may be a callable returning the list, so building it (and any
+    query that takes) is skipped while nobody is subscribed.
+    """
+    def publish():
+        broker = get_broker()
+        if not broker.has_subscribers():
+            broker.discard()
+            return
+        for event in events() if callable(events) else events:
+            broker.publish(event)
+
+    transaction.on_commit(publish, using=using)
@@ -0,0 +1,128 @@
+"""
+Streaming CSV and JSON Lines exports of workers and booking requests.
+
+Rows are fetched as tuples in chunks and encoded a chunk at a time, so memory
+use depends on the chunk size rather than the number of rows exported. The
+columns match what ``import_workers`` and ``import_bookings`` read back.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .importers import WorkerImporter, BookingImporter
+
+
+class CSVRenderer(BaseRenderer):
+    """Negotiates ``text/csv`` for export views; their rows are streamed, not rendered"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class JSONLinesRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+class _Echo:
+    """File-like object whose ``write`` hands back the line for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class Exporter:
+    # Export column name to ORM lookup; the first column must be the primary key
+    columns = {}
+    filename = None
+
+    def __init__(self, chunk_size=2000):
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+
+    def iter_rows(self, queryset):
+        """Value tuples in primary key order.
+
+        MySQL drivers buffer the whole result of ``iterator()``, so there the
+        rows are read in primary key seek batches instead.
+        """
+        queryset = queryset.order_by('pk').values_list(*self.columns.values())
+        if connections[queryset.db].vendor != 'mysql':
+            yield from queryset.iterator(chunk_size=self.chunk_size)
+            return
+
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(batch[:self.chunk_size])
+            yield from rows
+            if len(rows) < self.chunk_size:
+                return
+            last_pk = rows[-1][0]
+
+    def iter_chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def stream(self, queryset, output_format):
+        """Yield the export as text, one chunk of rows per item"""
+        encode = self.encode_csv if output_format == 'csv' else self.encode_jsonl
+        if output_format == 'csv':
+            yield self.encode_csv([tuple(self.columns)])
+        for chunk in self.iter_chunks(self.iter_rows(queryset)):
+            self.rows_written += len(chunk)
+            yield encode(chunk)
+
+    def encode_csv(self, rows):
+        writer = csv.writer(_Echo())
+        return ''.join(writer.writerow(row) for row in rows)
+
+    def encode_jsonl(self, rows):
+        names = list(self.columns)
+        return ''.join(
+            json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+class WorkerExporter(Exporter):
+    columns = {name: name for name in ['id'] + WorkerImporter.fields + ['created_at']}
+    filename = 'workers'
+
+
+class BookingExporter(Exporter):
+    columns = {
+        'id': 'id',
+        'worker_passport': 'worker__passport_number',
+        **{name: name for name in BookingImporter.fields},
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    filename = 'bookings'
+
+
+def filter_with_view(view_class, params):
+    """Queryset ``view_class`` would list for the ``(name, value)`` query parameters ``params``"""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(mutable=True)
+    for name, value in params:
+        request.GET.appendlist(name, value)
+    view = view_class()
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    return view.filter_queryset(view.get_queryset())
@@ -0,0 +1,114 @@
+"""
+Facet counts and numeric histograms for the worker filter sidebar.
+
+All counts come from one ``aggregate()`` call made of conditional COUNTs, so
+the filtered worker set is read once however many facet values there are.
+"""
+from django.db.models import Count, Max, Min, Q
+
+from .models import Worker
+
+
+CHOICE_FACETS = {
+    'profession': Worker.PROFESSION_CHOICES,
+    'nationality': Worker.NATIONALITY_CHOICES,
+    'status': Worker.STATUS_CHOICES,
+    'religion': Worker.RELIGION_CHOICES,
+    'marital_status': Worker.MARITAL_STATUS_CHOICES,
+}
+
+# Half-open [low, high) ranges; None leaves a side unbounded
+RANGE_FACETS = {
+    'age': [(None, 25), (25, 30), (30, 35), (35, 40), (40, 50), (50, None)],
+    'salary_expectation': [(None, 1000), (1000, 1500), (1500, 2000), (2000, 3000), (3000, None)],
+}
+
+# (start, stop, width) of the fixed-width histogram buckets behind the range
+# sliders; values outside [start, stop) fall into open-ended edge buckets
+HISTOGRAMS = {
+    'age': (18, 60, 2),
+    'experience_years': (0, 30, 1),
+    'salary_expectation': (0, 5000, 250),
+}
+
+
+def bucket_label(low, high):
+    if low is None:
+        return f'<{high}'
+    if high is None:
+        return f'{low}+'
+    return f'{low}-{high - 1}'
+
+
+def bucket_condition(field, low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def histogram_buckets(start, stop, width):
+    return [(None, start)] + [(low, low + width) for low in range(start, stop, width)] + [(stop, None)]
+
+
+def without_annotations(queryset):
+    if queryset.query.annotations:
+        # Select-list annotations such as search_rank would be evaluated per row
+        # inside the aggregate's subquery; filtering on the ids avoids that
+        queryset = Worker.objects.filter(pk__in=queryset.order_by().values('pk'))
+    return queryset
+
+
+def compute_facets(queryset):
+    """Counts per choice value and per range bucket over ``queryset``"""
+    queryset = without_annotations(queryset)
+
+    aggregates = {'total': Count('pk')}
+    labels = {}
+    for field, choices in CHOICE_FACETS.items():
+        for value, _ in choices:
+            alias = f'facet_{len(labels)}'
+            aggregates[alias] = Count('pk', filter=Q(**{field: value}))
+            labels[alias] = (field, value)
+    for field, buckets in RANGE_FACETS.items():
+        for low, high in buckets:
+            alias = f'facet_{len(labels)}'
+            aggregates[alias] = Count('pk', filter=bucket_condition(field, low, high))
+            labels[alias] = (field, bucket_label(low, high))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    facets = {field: {} for field in list(CHOICE_FACETS) + list(RANGE_FACETS)}
+    for alias, (field, label) in labels.items():
+        facets[field][label] = counts[alias]
+    return {'count': counts['total'], 'facets': facets}
+
+
+def compute_histograms(queryset):
+    """Bounds and fixed-width bucket counts of each numeric field over ``queryset``"""
+    queryset = without_annotations(queryset)
+
+    aggregates = {'total': Count('pk')}
+    buckets = {}
+    for field, (start, stop, width) in HISTOGRAMS.items():
+        aggregates[f'{field}_min'] = Min(field)
+        aggregates[f'{field}_max'] = Max(field)
+        buckets[field] = []
+        for low, high in histogram_buckets(start, stop, width):
+            alias = f'bucket_{len(aggregates)}'
+            aggregates[alias] = Count('pk', filter=bucket_condition(field, low, high))
+            buckets[field].append((alias, low, high))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    histograms = {}
+    for field, field_buckets in buckets.items():
+        histograms[field] = {
+            'min': counts[f'{field}_min'],
+            'max': counts[f'{field}_max'],
+            'buckets': [
+                {'low': low, 'high': high, 'count': counts[alias]}
+                for alias, low, high in field_buckets
+            ],
+        }
+    return {'count': counts['total'], 'histograms': histograms}
@@ -0,0 +1,124 @@
+"""
+Serializer-free rendering of read-only list pages.
+
+``FastRepresentation`` looks at a serializer's fields once per request and
+builds each row from a ``values()`` dict, instead of instantiating a model
+and calling every field's ``to_representation`` per row. Plain text and
+number columns are copied as they are; dates and decimals still use their
+serializer field so the output matches the serializer exactly.
+
+A ``SerializerMethodField`` is supported when its serializer defines
+``fast_<name>(row, media_url)``, reading the columns listed for it in
+``column_dependencies``. ``SlowPath`` is raised for anything else.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.encoding import iri_to_uri
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .metrics import measure
+from .pagination import KeysetPagination
+
+
+class SlowPath(Exception):
+    """The rows must go through the serializer"""
+
+
+# Serializer fields whose representation of a database value is the value itself
+COPIED_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ChoiceField, serializers.PrimaryKeyRelatedField,
+)
+CONVERTED_FIELDS = (serializers.DateTimeField, serializers.DateField, serializers.DecimalField)
+
+
+class MediaURL:
+    """Absolute storage URLs for one request, resolving the scheme and host once"""
+
+    def __init__(self, request):
+        self.request = request
+        self.scheme_host = request.build_absolute_uri('/')[:-1]
+
+    def __call__(self, storage, name):
+        url = storage.url(name)
+        if url.startswith('/') and not url.startswith('//') and '/./' not in url and '/../' not in url:
+            return iri_to_uri(self.scheme_host + url)
+        return self.request.build_absolute_uri(url)
+
+
+class FastRepresentation:
+    def __init__(self, serializer, request):
+        self.media_url = MediaURL(request)
+        self.columns = []
+        self.plan = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                handler = getattr(serializer, f'fast_{name}', None)
+                if handler is None:
+                    raise SlowPath(name)
+                self.add_columns(serializer.column_dependencies[name])
+                self.plan.append((name, None, handler))
+            elif field.source == '*' or not isinstance(field, COPIED_FIELDS + CONVERTED_FIELDS):
+                raise SlowPath(name)
+            else:
+                column = field.source.replace('.', '__')
+                self.add_columns([column])
+                converter = field.to_representation if isinstance(field, CONVERTED_FIELDS) else None
+                self.plan.append((name, column, converter))
+
+    def add_columns(self, columns):
+        self.columns.extend(column for column in columns if column not in self.columns)
+
+    def values(self, queryset):
+        """``queryset`` as dicts holding the needed columns plus its ordering keys for cursors"""
+        columns = list(self.columns)
+        for name in [*queryset.query.order_by, *KeysetPagination.tiebreak_fields]:
+            name = str(name).lstrip('-')
+            if name in columns:
+                continue
+            try:
+                queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                if name not in queryset.query.annotations:
+                    continue
+            columns.append(name)
+        return queryset.values(*columns)
+
+    def represent(self, rows):
+        data = []
+        with measure('serialization'):
+            for row in rows:
+                item = {}
+                for name, column, convert in self.plan:
+                    if column is None:
+                        item[name] = convert(row, self.media_url)
+                        continue
+                    value = row[column]
+                    item[name] = convert(value) if convert is not None and value is not None else value
+                data.append(item)
+        return data
+
+
+class FastListMixin:
+    """List view that renders pages through ``FastRepresentation`` when it can"""
+
+    def get_fast_representation(self):
+        if not settings.FAST_LIST_SERIALIZATION:
+            return None
+        try:
+            return FastRepresentation(self.get_serializer(), self.request)
+        except SlowPath:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_representation()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = fast.represent(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,38 @@
+import django_filters
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import Worker
+from .search import get_search_backend
+
+
+class WorkerFilter(django_filters.FilterSet):
+    """Choice filters plus inclusive min/max ranges on the indexed numeric columns"""
+    age_min = django_filters.NumberFilter(field_name='age', lookup_expr='gte')
+    age_max = django_filters.NumberFilter(field_name='age', lookup_expr='lte')
+    experience_min = django_filters.NumberFilter(field_name='experience_years', lookup_expr='gte')
+    experience_max = django_filters.NumberFilter(field_name='experience_years', lookup_expr='lte')
+    salary_min = django_filters.NumberFilter(field_name='salary_expectation', lookup_expr='gte')
+    salary_max = django_filters.NumberFilter(field_name='salary_expectation', lookup_expr='lte')
+
+    class Meta:
+        model = Worker
+        fields = ['profession', 'nationality', 'status', 'religion', 'marital_status']
+
+
+class WorkerSearchFilter(filters.SearchFilter):
+    """``?search=`` served by the configured full-text search backend.
+
+    List it after ``OrderingFilter``: when the client sends no ``ordering``
+    the matches are ordered by relevance, then by the view's default ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        queryset = get_search_backend(queryset.db).search(queryset, terms)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
@@ -0,0 +1,118 @@
+"""
+Resized variants of ``Worker.image``.
+
+Variants are JPEGs written next to the original through the image field's
+storage, named ``<stem>.<variant>.<hash>.jpg`` where the hash covers the
+original's bytes and the variant size, so a changed upload never reuses a
+stale file and browsers can cache variant URLs indefinitely. The generated
+names are recorded on ``Worker.image_variants`` together with the original
+they were made from, so serving a URL needs no filesystem access.
+
+Variants are generated once an upload commits (``api.signals``) or by
+``manage.py generate_image_variants``, never while serving a read; until then
+reads link the original. An original that cannot be read is recorded with an
+``error`` instead of variant names so it is not retried on every save, and
+variant files are deleted together with their worker.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> bounding box in pixels; the list grid shows cards at 300x200
+VARIANT_SIZES = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'full': (1200, 1200),
+}
+VARIANT_QUALITY = 85
+
+
+def variants_are_current(worker):
+    """Whether variants, or the failure to make them, are recorded for the current image"""
+    variants = worker.image_variants or {}
+    return bool(worker.image) and variants.get('source') == worker.image.name
+
+
+def variant_names(variants):
+    return [name for key, name in (variants or {}).items() if key in VARIANT_SIZES]
+
+
+def _render_variant(original, size):
+    image = original.copy()
+    image.thumbnail(size, Image.LANCZOS)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, format='JPEG', quality=VARIANT_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def generate_variants(worker, force=False):
+    """Write any missing variants for the worker's image and record their names.
+
+    Returns the ``image_variants`` mapping: empty when there is no image, and
+    holding ``source`` and ``error`` when the original cannot be read.
+    """
+    if not worker.image:
+        return {}
+    if variants_are_current(worker) and not force:
+        return worker.image_variants
+
+    storage = worker.image.storage
+    try:
+        with storage.open(worker.image.name, 'rb') as source:
+            content = source.read()
+        original = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+        original.load()
+    except (OSError, UnidentifiedImageError) as exc:
+        logger.warning('Could not read image %s for worker %s', worker.image.name, worker.pk)
+        return _record_variants(worker, {'source': worker.image.name, 'error': str(exc)[:200]})
+
+    digest = hashlib.sha1(content)
+    stem = os.path.splitext(worker.image.name)[0]
+    variants = {'source': worker.image.name}
+    for variant, size in VARIANT_SIZES.items():
+        variant_hash = digest.copy()
+        variant_hash.update(f'{variant}:{size[0]}x{size[1]}:{VARIANT_QUALITY}'.encode('ascii'))
+        name = f'{stem}.{variant}.{variant_hash.hexdigest()[:12]}.jpg'
+        if force or not storage.exists(name):
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(_render_variant(original, size)))
+        variants[variant] = name
+
+    return _record_variants(worker, variants)
+
+
+def _record_variants(worker, variants):
+    storage = worker.image.storage
+    for name in set(variant_names(worker.image_variants)) - set(variant_names(variants)):
+        storage.delete(name)
+
+    type(worker).objects.filter(pk=worker.pk).update(image_variants=variants, updated_at=timezone.now())
+    worker.image_variants = variants
+    return variants
+
+
+def delete_variants(storage, variants):
+    """Remove the variant files named in an ``image_variants`` mapping"""
+    for name in variant_names(variants):
+        storage.delete(name)
+
+
+def variant_url(worker, variant):
+    """Storage URL of ``variant``, or of the original while it has none"""
+    if not worker.image:
+        return None
+    name = worker.image_variants.get(variant) if variants_are_current(worker) else None
+    if name is None:
+        return worker.image.url
+    return worker.image.storage.url(name)
@@ -0,0 +1,214 @@
+"""
+Streaming batch importers used by the ``import_workers`` and
+``import_bookings`` management commands.
+
+Rows are read one at a time from CSV or JSON Lines, validated with the model
+field validators and written in batches, so memory use depends on the batch
+size rather than the file size. ``bulk_create`` skips model signals, so each
+importer refreshes the search index, booking rollups, stats cache and
+response cache itself.
+"""
+import csv
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .caching import bump_model_version
+from .models import Worker, BookingRequest
+from .rollups import RollupDeltas
+from .search import get_search_backend
+from .stats import invalidate_stats
+from .tags import sync_worker_tags
+
+
+@contextmanager
+def open_input(path):
+    if path == '-':
+        yield sys.stdin
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            yield handle
+
+
+def read_rows(handle, input_format):
+    """Yield ``(line number, dict)`` pairs; unparsable lines yield an error string instead of a dict"""
+    if input_format == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Expected a JSON object'
+            continue
+        yield line_number, row
+
+
+def guess_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.read / elapsed if elapsed else 0.0
+
+    def summary(self):
+        return (
+            f'{self.read} rows read, {self.written} written, {self.rejected} rejected '
+            f'in {time.monotonic() - self.started:.1f}s ({self.rate:.0f} rows/s)'
+        )
+
+
+class BaseImporter(ABC):
+    model = None
+    fields = []
+
+    def __init__(self, batch_size=1000, on_reject=None, on_batch=None):
+        self.batch_size = batch_size
+        self.on_reject = on_reject or (lambda line_number, errors: None)
+        self.on_batch = on_batch or (lambda stats: None)
+        self.stats = ImportStats()
+
+    def build_instance(self, row):
+        """Model instance from the row's known columns, with blanks meaning null/default"""
+        values = {}
+        for name in self.fields:
+            value = row.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '':
+                field = self.model._meta.get_field(name)
+                if field.null:
+                    values[name] = None
+                continue
+            values[name] = value
+        return self.model(**values)
+
+    def clean(self, instance, row):
+        """Run the model's field validators; uniqueness is left to the database"""
+        instance.full_clean(exclude=self.clean_exclude(), validate_unique=False, validate_constraints=False)
+
+    def clean_exclude(self):
+        return []
+
+    def reject(self, line_number, errors):
+        self.stats.rejected += 1
+        self.on_reject(line_number, errors)
+
+    def run(self, rows):
+        batch = []
+        for line_number, row in rows:
+            self.stats.read += 1
+            if not isinstance(row, dict):
+                self.reject(line_number, {'__all__': [row]})
+                continue
+            try:
+                instance = self.build_instance(row)
+                self.clean(instance, row)
+            except ValidationError as exc:
+                self.reject(line_number, exc.message_dict if hasattr(exc, 'error_dict') else {'__all__': exc.messages})
+                continue
+            except (TypeError, ValueError) as exc:
+                self.reject(line_number, {'__all__': [str(exc)]})
+                continue
+            batch.append((line_number, row, instance))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        self.finish()
+        return self.stats
+
+    def flush(self, batch):
+        with transaction.atomic():
+            self.stats.written += self.write(batch)
+        self.on_batch(self.stats)
+
+    @abstractmethod
+    def write(self, batch):
+        """Save a batch of ``(line number, row, instance)`` and return how many rows were written"""
+
+    def finish(self):
+        invalidate_stats()
+        bump_model_version(self.model)
+
+
+class WorkerImporter(BaseImporter):
+    """Upsert workers on ``passport_number``"""
+    model = Worker
+    fields = [
+        'name', 'passport_number', 'nationality', 'religion', 'profession', 'marital_status',
+        'age', 'status', 'experience_years', 'languages_spoken', 'skills', 'salary_expectation',
+    ]
+
+    def write(self, batch):
+        # A passport repeated inside one batch keeps its last row
+        workers = list({instance.passport_number: instance for _, _, instance in batch}.values())
+        Worker.objects.bulk_create(
+            workers,
+            update_conflicts=True,
+            unique_fields=['passport_number'],
+            update_fields=[name for name in self.fields if name != 'passport_number'] + ['updated_at'],
+        )
+        saved = list(Worker.objects.filter(passport_number__in=[worker.passport_number for worker in workers]))
+        sync_worker_tags(saved)
+        get_search_backend().index_many(saved)
+        return len(workers)
+
+
+class BookingImporter(BaseImporter):
+    """Insert booking requests, linking each to a worker by ``worker_passport``"""
+    model = BookingRequest
+    fields = [
+        'full_name', 'phone_number', 'email', 'address', 'notes', 'status',
+        'preferred_start_date', 'contract_duration',
+    ]
+
+    def clean_exclude(self):
+        return ['worker']
+
+    def write(self, batch):
+        passports = {row.get('worker_passport') for _, row, _ in batch}
+        workers = {
+            passport: (pk, profession, nationality)
+            for passport, pk, profession, nationality in Worker.objects.filter(passport_number__in=passports)
+            .values_list('passport_number', 'id', 'profession', 'nationality')
+        }
+        bookings, groups = [], []
+        for line_number, row, booking in batch:
+            worker = workers.get(row.get('worker_passport'))
+            if worker is None:
+                self.reject(line_number, {'worker_passport': ['No worker with this passport number.']})
+                continue
+            booking.worker_id = worker[0]
+            bookings.append(booking)
+            groups.append(worker[1:])
+        BookingRequest.objects.bulk_create(bookings)
+
+        deltas = RollupDeltas()
+        for booking, (profession, nationality) in zip(bookings, groups):
+            deltas.add(booking.created_at, booking.status, profession, nationality)
+        deltas.apply()
+        return len(bookings)
@@ -0,0 +1,193 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from api import urls as api_urls
+from api.mixins import QueryCounter
+from api.models import Worker, BookingRequest
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every URL in api/urls.py: p50/p95 latency and query counts, '
+        'saved as JSON so runs can be compared'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--only', nargs='*', help='URL names to run (default: all)')
+        parser.add_argument(
+            '--output-dir', default=str(Path(settings.BASE_DIR) / 'benchmarks'),
+            help='Directory the JSON result file is written to'
+        )
+        parser.add_argument('--compare', help='Earlier result file to print deltas against')
+
+    def scenarios(self):
+        """(url name, label, method, path, payload) for every benchmarked request"""
+        worker = Worker.objects.filter(status='Available').order_by('pk').first() or Worker.objects.order_by('pk').first()
+        booking = BookingRequest.objects.order_by('pk').first()
+        if worker is None:
+            raise CommandError('No workers in the database; run generate_dataset first')
+
+        scenarios = {
+            'worker-list': [
+                ('default', 'get', reverse('worker-list'), None),
+                ('filtered', 'get', reverse('worker-list') + '?status=Available&profession=Cook', None),
+                ('age range', 'get', reverse('worker-list') + '?age_min=25&age_max=35&ordering=age', None),
+                ('search', 'get', reverse('worker-list') + '?search=elderly', None),
+                ('deep page', 'get', reverse('worker-list') + '?page=200', None),
+                ('cursor', 'get', reverse('worker-list') + '?cursor=', None),
+            ],
+            'worker-detail': [
+                ('default', 'get', reverse('worker-detail', args=[worker.pk]), None),
+            ],
+            'booking-list': [
+                ('default', 'get', reverse('booking-list'), None),
+                ('filtered', 'get', reverse('booking-list') + '?status=Pending&worker__profession=Cook', None),
+            ],
+            'booking-create': [
+                ('default', 'post', reverse('booking-create'), {
+                    'worker': worker.pk, 'full_name': 'Benchmark Client', 'phone_number': '+966501234567',
+                }),
+            ],
+        }
+        pending = list(BookingRequest.objects.filter(status='Pending').order_by('pk').values_list('pk', flat=True)[:100])
+        if pending:
+            scenarios['booking-bulk-status'] = [
+                ('approve', 'post', reverse('booking-bulk-status'), {'ids': pending, 'status': 'Approved'}),
+                ('reject', 'post', reverse('booking-bulk-status'), {'ids': pending, 'status': 'Rejected'}),
+            ]
+        if booking is not None:
+            scenarios['booking-detail'] = [
+                ('default', 'get', reverse('booking-detail', args=[booking.pk]), None),
+                ('patch', 'patch', reverse('booking-detail', args=[booking.pk]), {'notes': 'benchmark'}),
+            ]
+
+        for pattern in api_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in scenarios:
+                continue
+            if pattern.pattern.converters:
+                self.stderr.write(f'No scenario for {pattern.name}; it needs URL arguments')
+                continue
+            scenarios[pattern.name] = [('default', 'get', reverse(pattern.name), None)]
+        return scenarios
+
+    def run_request(self, client, method, path, payload):
+        """Time one request; writes are rolled back so runs do not change the dataset"""
+        result = {}
+        try:
+            with transaction.atomic():
+                with QueryCounter() as counter:
+                    started = time.perf_counter()
+                    if payload is None:
+                        response = getattr(client, method)(path)
+                    else:
+                        response = getattr(client, method)(path, json.dumps(payload), content_type='application/json')
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    result['seconds'] = time.perf_counter() - started
+                result['queries'] = counter.count
+                result['status'] = response.status_code
+                if method != 'get':
+                    raise Rollback
+        except Rollback:
+            pass
+        return result
+
+    def handle(self, *args, **options):
+        client = Client()
+        results = []
+        for name, cases in self.scenarios().items():
+            if options['only'] and name not in options['only']:
+                continue
+            for label, method, path, payload in cases:
+                for _ in range(options['warmup']):
+                    self.run_request(client, method, path, payload)
+                timings, queries, statuses = [], [], set()
+                for _ in range(options['iterations']):
+                    if options['cold']:
+                        cache.clear()
+                    result = self.run_request(client, method, path, payload)
+                    timings.append(result['seconds'] * 1000)
+                    queries.append(result['queries'])
+                    statuses.add(result['status'])
+                row = {
+                    'name': name,
+                    'label': label,
+                    'method': method.upper(),
+                    'path': path,
+                    'p50_ms': round(statistics.median(timings), 3),
+                    'p95_ms': round(percentile(timings, 0.95), 3),
+                    'mean_ms': round(statistics.fmean(timings), 3),
+                    'queries': max(queries),
+                    'statuses': sorted(statuses),
+                }
+                results.append(row)
+                self.stdout.write(
+                    f"{name:<16} {label:<10} p50 {row['p50_ms']:>9.2f} ms  p95 {row['p95_ms']:>9.2f} ms  "
+                    f"queries {row['queries']:>3}  status {','.join(map(str, row['statuses']))}"
+                )
+
+        report = {
+            'recorded_at': datetime.now(dt_timezone.utc).isoformat(),
+            'commit': self.git_commit(),
+            'database': connection.vendor,
+            'workers': Worker.objects.count(),
+            'bookings': BookingRequest.objects.count(),
+            'iterations': options['iterations'],
+            'cold_cache': options['cold'],
+            'results': results,
+        }
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output = output_dir / f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), report)
+
+    def compare(self, before, after):
+        previous = {(row['name'], row['label']): row for row in before['results']}
+        self.stdout.write(f"Compared with {before.get('commit')} ({before.get('workers')} workers):")
+        for row in after['results']:
+            old = previous.get((row['name'], row['label']))
+            if old is None:
+                continue
+            change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+            self.stdout.write(
+                f"{row['name']:<16} {row['label']:<10} p50 {old['p50_ms']:.2f} -> {row['p50_ms']:.2f} ms "
+                f"({change:+.1f}%)  queries {old['queries']} -> {row['queries']}"
+            )
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
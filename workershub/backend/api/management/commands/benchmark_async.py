@@ -0,0 +1,119 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import reverse
+
+from api import async_views, views
+from api.models import Worker
+
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the sync views in api.views with the '
+        'async ORM views in api.async_views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and concurrency level')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Keep the response and stats caches on (by default every request reads the database)'
+        )
+
+    def scenarios(self):
+        """(label, path, view kwargs, sync view, async view)"""
+        worker = Worker.objects.order_by('pk').first()
+        if worker is None:
+            raise CommandError('No workers in the database; run generate_dataset first')
+        list_path = reverse('worker-list')
+        return [
+            ('worker list', list_path, {}, views.WorkerListView, async_views.WorkerListView),
+            ('worker filter', list_path + '?status=Available&profession=Cook', {},
+             views.WorkerListView, async_views.WorkerListView),
+            ('worker cursor', list_path + '?cursor=', {}, views.WorkerListView, async_views.WorkerListView),
+            ('worker detail', reverse('worker-detail', args=[worker.pk]), {'pk': worker.pk},
+             views.WorkerDetailView, async_views.WorkerDetailView),
+            ('worker stats', reverse('worker-stats'), {}, views.worker_stats, async_views.worker_stats),
+            ('booking stats', reverse('booking-stats'), {}, views.booking_stats, async_views.booking_stats),
+        ]
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        if options['cached']:
+            self.run(scenarios, options)
+        else:
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0, STATS_CACHE_TIMEOUT=0):
+                self.run(scenarios, options)
+
+    def run(self, scenarios, options):
+        self.factory = AsyncRequestFactory()
+        for label, path, kwargs, sync_view, async_view in scenarios:
+            sync_view = self.as_view(sync_view)
+            async_view = self.as_view(async_view)
+            for concurrency in options['concurrency']:
+                rows = {}
+                for mode, handler in (('sync', self.call_sync), ('async', self.call_async)):
+                    view = sync_view if mode == 'sync' else async_view
+                    rows[mode] = asyncio.run(
+                        self.measure(handler, view, path, kwargs, options['requests'], concurrency)
+                    )
+                speedup = rows['async']['rps'] / rows['sync']['rps'] if rows['sync']['rps'] else 0.0
+                self.stdout.write(
+                    f"{label:<14} c={concurrency:<3} "
+                    f"sync {rows['sync']['rps']:>8.1f} req/s (p95 {rows['sync']['p95_ms']:>7.1f} ms)  "
+                    f"async {rows['async']['rps']:>8.1f} req/s (p95 {rows['async']['p95_ms']:>7.1f} ms)  "
+                    f"x{speedup:.2f}"
+                )
+
+    def as_view(self, view):
+        return view.as_view() if isinstance(view, type) else view
+
+    async def call_sync(self, view, path, kwargs):
+        # As under an ASGI server: the whole sync view runs on a thread of its own
+        def run():
+            response = view(self.factory.get(path), **kwargs)
+            # Responses served from the response cache are already rendered
+            if hasattr(response, 'render'):
+                response.render()
+            connections.close_all()
+            return response
+        async with ThreadSensitiveContext():
+            return await sync_to_async(run)()
+
+    async def call_async(self, view, path, kwargs):
+        async with ThreadSensitiveContext():
+            response = await view(self.factory.get(path), **kwargs)
+            if hasattr(response, 'render'):
+                await sync_to_async(response.render)()
+            await sync_to_async(connections.close_all)()
+            return response
+
+    async def measure(self, handler, view, path, kwargs, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await handler(view, path, kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code not in (200, 304):
+                    raise CommandError(f'{path} returned {response.status_code}')
+
+        await handler(view, path, kwargs)
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return {
+            'rps': total / elapsed,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+        }
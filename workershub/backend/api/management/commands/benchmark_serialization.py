@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.fastpath import FastRepresentation, SlowPath
+from api.renderers import FastJSONRenderer
+from api.views import WorkerListView, BookingRequestListView
+
+
+class Command(BaseCommand):
+    help = (
+        'Time serializer + JSONRenderer against the values() fast path + FastJSONRenderer '
+        'for list pages, checking that both produce the same bytes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        cases = [
+            ('workers', WorkerListView, '/api/workers/'),
+            ('workers sparse', WorkerListView, '/api/workers/?fields=id,name,status'),
+            ('bookings', BookingRequestListView, '/api/bookings/'),
+        ]
+        for label, view_class, path in cases:
+            view = self.make_view(view_class, path)
+            queryset = view.filter_queryset(view.get_queryset())
+            try:
+                fast = FastRepresentation(view.get_serializer(), view.request)
+            except SlowPath as exc:
+                raise CommandError(f'{label}: the fast path does not support field {exc}')
+
+            def slow_path():
+                return JSONRenderer().render(view.get_serializer(list(queryset[:options['rows']]), many=True).data)
+
+            def fast_path():
+                return FastJSONRenderer().render(fast.represent(list(fast.values(queryset)[:options['rows']])))
+
+            identical = slow_path() == fast_path()
+            slow_ms = self.time(slow_path, options['iterations'])
+            fast_ms = self.time(fast_path, options['iterations'])
+            self.stdout.write(
+                f'{label:<15} serializer {slow_ms:>8.2f} ms  fast path {fast_ms:>8.2f} ms  '
+                f'x{slow_ms / fast_ms:.1f}  identical output: {"yes" if identical else "NO"}'
+            )
+            if not identical:
+                raise CommandError(f'{label}: fast path output differs from the serializer')
+
+    def make_view(self, view_class, path):
+        request = RequestFactory().get(path)
+        view = view_class()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        return view
+
+    def time(self, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
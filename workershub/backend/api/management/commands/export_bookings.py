@@ -0,0 +1,13 @@
+from api.exports import BookingExporter
+from api.views import BookingRequestListView
+
+from .export_workers import Command as ExportWorkersCommand
+
+
+class Command(ExportWorkersCommand):
+    help = (
+        'Stream booking requests to a CSV or JSON Lines file, optionally filtered like '
+        '/api/bookings/; each row names its worker in a worker_passport column'
+    )
+    exporter_class = BookingExporter
+    view_class = BookingRequestListView
@@ -0,0 +1,49 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.exports import WorkerExporter, filter_with_view
+from api.importers import guess_format
+from api.views import WorkerListView
+
+
+class Command(BaseCommand):
+    help = 'Stream workers to a CSV or JSON Lines file, optionally filtered like /api/workers/'
+    exporter_class = WorkerExporter
+    view_class = WorkerListView
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or '-' for stdout")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Output format (default: from the file extension)')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='List view query parameter, e.g. --filter status=Available; may be repeated'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched and written at a time')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        output_format = options['format'] or guess_format(path)
+        params = []
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Filters must look like NAME=VALUE, got {item!r}')
+            params.append((name, value))
+        try:
+            queryset = filter_with_view(self.view_class, params)
+        except ValidationError as exc:
+            raise CommandError(f'Invalid filter: {json.dumps(exc.detail)}')
+
+        exporter = self.exporter_class(chunk_size=options['chunk_size'])
+        output = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            for text in exporter.stream(queryset, output_format):
+                output.write(text)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {exporter.rows_written} rows'))
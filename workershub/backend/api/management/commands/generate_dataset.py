@@ -0,0 +1,256 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.caching import bump_model_version
+from api.models import Worker, BookingRequest
+from api.rollups import RollupDeltas
+from api.search import get_search_backend
+from api.stats import invalidate_stats
+from api.tags import sync_worker_tags
+from api.transitions import sync_worker_status
+
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Synthetic workers are recognisable by this passport prefix
+PASSPORT_PREFIX = 'SYN'
+
+NAMES = {
+    'Filipino': (['Maria', 'Ana', 'Rosa', 'Jenny', 'Marites', 'Liza'], ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia']),
+    'Indonesian': (['Siti', 'Dewi', 'Sri', 'Ayu', 'Rina', 'Wati'], ['Nurhaliza', 'Lestari', 'Wulandari', 'Rahayu']),
+    'Indian': (['Priya', 'Lakshmi', 'Anita', 'Sunita', 'Kavita'], ['Sharma', 'Nair', 'Reddy', 'Pillai', 'Das']),
+    'Sri Lankan': (['Nirmala', 'Chamari', 'Dilani', 'Kumari'], ['Perera', 'Fernando', 'Silva', 'Jayasinghe']),
+    'Ethiopian': (['Fatima', 'Tigist', 'Meron', 'Hiwot', 'Selam'], ['Ahmed', 'Tesfaye', 'Bekele', 'Girma']),
+    'Kenyan': (['Grace', 'Faith', 'Mercy', 'Joy', 'Esther'], ['Wanjiku', 'Achieng', 'Otieno', 'Kamau']),
+    'Bangladeshi': (['Rashida', 'Nasrin', 'Shirin', 'Ruma'], ['Begum', 'Akter', 'Khatun', 'Islam']),
+    'Nepalese': (['Sunita', 'Sita', 'Gita', 'Maya', 'Kamala'], ['Thapa', 'Gurung', 'Rai', 'Tamang']),
+    'Other': (['Amina', 'Rose', 'Leila', 'Nadia'], ['Hassan', 'Mensah', 'Okafor', 'Diallo']),
+}
+
+LANGUAGES = {
+    'Filipino': ['Filipino', 'Tagalog'],
+    'Indonesian': ['Indonesian'],
+    'Indian': ['Hindi', 'Malayalam', 'Tamil'],
+    'Sri Lankan': ['Sinhala', 'Tamil'],
+    'Ethiopian': ['Amharic', 'Oromo'],
+    'Kenyan': ['Swahili'],
+    'Bangladeshi': ['Bengali'],
+    'Nepalese': ['Nepali'],
+    'Other': ['French'],
+}
+
+SKILLS = {
+    'Housemaid': ['Cleaning', 'Laundry', 'Ironing', 'Cooking', 'Childcare'],
+    'Cleaner': ['Deep cleaning', 'Window cleaning', 'Organizing', 'Laundry'],
+    'Cook': ['Arabic cuisine', 'Indian cuisine', 'Baking', 'Vegetarian cooking', 'Meal planning'],
+    'Nanny': ['Childcare', 'Educational activities', 'First aid', 'Infant care'],
+    'Caregiver': ['Elderly care', 'Medical assistance', 'First aid', 'Physiotherapy support'],
+    'Driver': ['Saudi driving license', 'City navigation', 'Car maintenance'],
+    'Gardener': ['Landscaping', 'Irrigation', 'Pruning'],
+    'Other': ['Pet care', 'Tutoring'],
+}
+
+BASE_SALARY = {
+    'Housemaid': 1000, 'Cleaner': 950, 'Cook': 1200, 'Nanny': 1300,
+    'Caregiver': 1400, 'Driver': 1800, 'Gardener': 1100, 'Other': 1000,
+}
+
+CLIENT_NAMES = ['Ahmed', 'Mohammed', 'Sarah', 'Noura', 'Abdullah', 'Fahad', 'Reem', 'Khalid', 'Huda']
+CLIENT_SURNAMES = ['Al-Rashid', 'Al-Harbi', 'Al-Otaibi', 'Johnson', 'Al-Qahtani', 'Al-Zahrani']
+CITIES = ['Riyadh', 'Jeddah', 'Dammam', 'Mecca', 'Medina', 'Khobar']
+
+
+def _choice_values(choices):
+    return [value for value, _ in choices]
+
+
+def restore_timestamps(model, instances, timestamps, batch_size):
+    """Write back the timestamps bulk_create replaced with auto_now/auto_now_add.
+
+    ``timestamps`` holds one dict of field name -> value per instance, taken
+    before the insert.
+    """
+    if not instances:
+        return
+    for instance, values in zip(instances, timestamps):
+        for name, value in values.items():
+            setattr(instance, name, value)
+    model.objects.bulk_update(instances, list(timestamps[0]), batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of workers and booking requests for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=SIZES, default='10k', help='Number of workers to generate')
+        parser.add_argument('--workers', type=int, help='Exact number of workers (overrides --size)')
+        parser.add_argument('--bookings-per-worker', type=float, default=0.5, help='Average booking requests per worker')
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated workers first')
+
+    def handle(self, *args, **options):
+        total = options['workers'] or SIZES[options['size']]
+        if total <= 0:
+            raise CommandError('Number of workers must be positive')
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        batch_size = options['batch_size']
+
+        if options['clear']:
+            deleted, _ = Worker.objects.filter(passport_number__startswith=PASSPORT_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} previously generated rows')
+
+        start = (
+            Worker.objects.filter(passport_number__startswith=PASSPORT_PREFIX)
+            .order_by('-passport_number').values_list('passport_number', flat=True).first()
+        )
+        offset = int(start[len(PASSPORT_PREFIX):]) + 1 if start else 0
+
+        started = time.monotonic()
+        workers_created = bookings_created = 0
+        for batch_start in range(0, total, batch_size):
+            count = min(batch_size, total - batch_start)
+            with transaction.atomic():
+                workers = [self.make_worker(offset + batch_start + i) for i in range(count)]
+                created = {worker.passport_number: worker.created_at for worker in workers}
+                workers = Worker.objects.bulk_create(workers)
+                if not workers or workers[0].pk is None:
+                    workers = list(
+                        Worker.objects.filter(passport_number__in=list(created))
+                        .only('id', 'passport_number', 'status', 'profession', 'nationality', 'languages_spoken', 'skills')
+                    )
+                restore_timestamps(
+                    Worker, workers, [{'created_at': created[worker.passport_number]} for worker in workers], batch_size
+                )
+                sync_worker_tags(workers)
+
+                bookings = self.make_bookings(workers, options['bookings_per_worker'])
+                timestamps = [{'created_at': b.created_at, 'updated_at': b.updated_at} for b in bookings]
+                BookingRequest.objects.bulk_create(bookings, batch_size=batch_size)
+                self.fill_booking_pks(workers, bookings)
+                restore_timestamps(BookingRequest, bookings, timestamps, batch_size)
+                # Booked exactly while a pending or approved booking holds the worker, as in the app
+                sync_worker_status([worker.pk for worker in workers])
+                self.update_rollups(workers, bookings)
+            workers_created += count
+            bookings_created += len(bookings)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{workers_created}/{total} workers, {bookings_created} bookings '
+                f'({workers_created / elapsed:.0f} workers/s)'
+            )
+
+        self.stdout.write('Rebuilding search index...')
+        get_search_backend().rebuild()
+        invalidate_stats()
+        bump_model_version(Worker)
+        bump_model_version(BookingRequest)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {workers_created} workers and {bookings_created} booking requests '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
+
+    def random_past(self, after=None):
+        earliest = after or self.now - timedelta(days=self.days)
+        span = (self.now - earliest).total_seconds()
+        return earliest + timedelta(seconds=self.random.random() * span)
+
+    def make_worker(self, number):
+        rnd = self.random
+        nationality = rnd.choices(
+            _choice_values(Worker.NATIONALITY_CHOICES), weights=[20, 18, 14, 10, 12, 10, 8, 6, 2]
+        )[0]
+        profession = rnd.choices(
+            _choice_values(Worker.PROFESSION_CHOICES), weights=[30, 18, 14, 12, 10, 8, 5, 3]
+        )[0]
+        first_names, last_names = NAMES[nationality]
+        age = rnd.randint(21, 55)
+        experience = rnd.randint(0, min(25, age - 20))
+        languages = ['English'] + rnd.sample(LANGUAGES[nationality], k=1)
+        if rnd.random() < 0.4:
+            languages.append('Arabic')
+        salary = BASE_SALARY[profession] + experience * 25 + rnd.randint(-100, 200)
+
+        return Worker(
+            name=f'{rnd.choice(first_names)} {rnd.choice(last_names)}',
+            passport_number=f'{PASSPORT_PREFIX}{number:09d}',
+            nationality=nationality,
+            religion=rnd.choice(_choice_values(Worker.RELIGION_CHOICES) + [None]),
+            profession=profession,
+            marital_status=rnd.choice(_choice_values(Worker.MARITAL_STATUS_CHOICES) + [None]),
+            age=age,
+            # Booked is derived from the bookings once they exist
+            status=rnd.choices(['Available', 'On Leave'], weights=[90, 10])[0],
+            created_at=self.random_past(),
+            experience_years=experience,
+            languages_spoken=', '.join(languages),
+            skills=', '.join(rnd.sample(SKILLS[profession], k=min(2, len(SKILLS[profession])))),
+            salary_expectation=Decimal(salary) if rnd.random() < 0.9 else None,
+        )
+
+    def make_bookings(self, workers, per_worker):
+        """Booking history of each worker; only the latest booking may still hold it.
+
+        The API only books Available workers, so a worker has at most one
+        pending or approved booking, and none while On Leave.
+        """
+        rnd = self.random
+        statuses = _choice_values(BookingRequest.STATUS_CHOICES)
+        bookings = []
+        for worker in workers:
+            count = int(per_worker) + (1 if rnd.random() < per_worker % 1 else 0)
+            created = sorted(self.random_past(after=worker.created_at) for _ in range(count))
+            for index, created_at in enumerate(created):
+                status = rnd.choices(statuses, weights=[50, 30, 20])[0]
+                if worker.status == 'On Leave' or index < count - 1:
+                    status = 'Rejected'
+                booking = BookingRequest(
+                    worker_id=worker.pk,
+                    full_name=f'{rnd.choice(CLIENT_NAMES)} {rnd.choice(CLIENT_SURNAMES)}',
+                    phone_number=f'+9665{rnd.randint(10_000_000, 99_999_999)}',
+                    email=None if rnd.random() < 0.3 else f'client{rnd.randint(1, 10**6)}@example.com',
+                    address=f'{rnd.choice(CITIES)}, Saudi Arabia',
+                    notes='',
+                    status=status,
+                    created_at=created_at,
+                    updated_at=created_at if status == 'Pending' else self.random_past(after=created_at),
+                    preferred_start_date=(created_at + timedelta(days=rnd.randint(7, 60))).date(),
+                    contract_duration=rnd.choice(['6 months', '1 year', '2 years']),
+                )
+                if status == 'Approved':
+                    booking.approved_at = booking.updated_at
+                bookings.append(booking)
+        return bookings
+
+    def fill_booking_pks(self, workers, bookings):
+        """Primary keys for backends whose bulk_create does not return them (MySQL)"""
+        if not bookings or bookings[0].pk is not None:
+            return
+        pks = defaultdict(list)
+        rows = (
+            BookingRequest.objects.filter(worker_id__in=[worker.pk for worker in workers])
+            .order_by('pk').values_list('worker_id', 'pk')
+        )
+        for worker_id, pk in rows:
+            pks[worker_id].append(pk)
+        # The workers are new, so their bookings are exactly this batch, inserted in list order
+        for booking in reversed(bookings):
+            booking.pk = pks[booking.worker_id].pop()
+
+    def update_rollups(self, workers, bookings):
+        """bulk_create skips the signals that keep the booking rollups current"""
+        groups = {worker.pk: (worker.profession, worker.nationality) for worker in workers}
+        deltas = RollupDeltas()
+        for booking in bookings:
+            deltas.add(booking.created_at, booking.status, *groups[booking.worker_id], approved_at=booking.approved_at)
+        deltas.apply()
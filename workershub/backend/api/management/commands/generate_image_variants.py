@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants, variants_are_current
+from api.models import Worker
+
+
+class Command(BaseCommand):
+    help = 'Generate thumb/card/full variants for worker images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true', help='Regenerate variants that already exist or failed before'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Workers fetched per query')
+
+    def handle(self, *args, **options):
+        workers = (
+            Worker.objects.exclude(image='').exclude(image__isnull=True)
+            .only('id', 'image', 'image_variants')
+            .order_by('pk')
+        )
+        generated = skipped = failed = 0
+        for worker in workers.iterator(chunk_size=options['chunk_size']):
+            if variants_are_current(worker) and not options['force']:
+                skipped += 1
+            elif 'error' not in generate_variants(worker, force=options['force']):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Could not read image for worker {worker.pk}: {worker.image.name}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {generated} workers ({skipped} already current, {failed} failed)'
+        ))
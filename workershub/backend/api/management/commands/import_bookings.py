@@ -0,0 +1,11 @@
+from api.importers import BookingImporter
+
+from .import_workers import Command as ImportWorkersCommand
+
+
+class Command(ImportWorkersCommand):
+    help = (
+        'Stream booking requests from a CSV or JSON Lines file; each row names its '
+        'worker in a worker_passport column'
+    )
+    importer_class = BookingImporter
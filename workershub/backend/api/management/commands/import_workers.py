@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.importers import WorkerImporter, guess_format, open_input, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream workers from a CSV or JSON Lines file and upsert them on passport_number'
+    importer_class = WorkerImporter
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per bulk query')
+        parser.add_argument('--rejects', help='Write rejected rows with their errors to this JSON Lines file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or guess_format(path)
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+
+        def on_reject(line_number, errors):
+            if rejects:
+                rejects.write(json.dumps({'line': line_number, 'errors': errors}) + '\n')
+            elif options['verbosity'] > 1:
+                self.stderr.write(f'Line {line_number}: {errors}')
+
+        def on_batch(stats):
+            if options['verbosity'] > 0:
+                self.stdout.write(stats.summary())
+
+        importer = self.importer_class(batch_size=options['batch_size'], on_reject=on_reject, on_batch=on_batch)
+        try:
+            with open_input(path) as handle:
+                stats = importer.run(read_rows(handle, input_format))
+        finally:
+            if rejects:
+                rejects.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Import finished: {stats.summary()}'))
+        if stats.rejected and not rejects and options['verbosity'] < 2:
+            self.stderr.write(self.style.WARNING(
+                f'{stats.rejected} rows rejected; list them with --rejects FILE or --verbosity 2'
+            ))
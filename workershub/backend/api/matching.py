@@ -0,0 +1,212 @@
+"""
+Ranking available workers against what a client asks for.
+
+``MatchIndex`` keeps one row per worker in NumPy arrays: profession and
+nationality codes, experience, age, salary expectation and a column per
+language spoken. A match scores every candidate row with a few vectorized
+operations and partitions out the top k, so the cost does not depend on
+loading or serializing the workers that lose.
+
+The index lives in process memory and follows the worker table through the
+change feed in ``api.changes``: it is built on first use, and every match
+first applies the saves and deletes made since its cursor, by this process
+or any other. Bulk updates stamp ``updated_at``, so they are picked up too.
+"""
+import threading
+
+import numpy as np
+
+from .changes import decode_cursor, read_changes
+from .models import Worker
+from .tags import split_tags
+
+
+# Columns the index reads from the worker table
+INDEX_FIELDS = [
+    'id', 'updated_at', 'status', 'profession', 'nationality',
+    'languages_spoken', 'experience_years', 'age', 'salary_expectation',
+]
+
+PROFESSION_CODES = {value: code for code, (value, _) in enumerate(Worker.PROFESSION_CHOICES)}
+NATIONALITY_CODES = {value: code for code, (value, _) in enumerate(Worker.NATIONALITY_CHOICES)}
+
+# Relative weight of each part of the score; parts the client did not ask for are left out
+WEIGHTS = {
+    'languages': 3.0,
+    'budget': 3.0,
+    'experience': 2.0,
+    'nationality': 1.0,
+    'age': 1.0,
+}
+# A salary this fraction over budget scores 0; an unknown salary scores UNKNOWN_SALARY_SCORE
+BUDGET_TOLERANCE = 0.25
+UNKNOWN_SALARY_SCORE = 0.5
+# Years of experience that score fully when the client sets no minimum
+DEFAULT_EXPERIENCE_TARGET = 10
+# Years outside the requested age range at which the age part reaches 0
+AGE_TOLERANCE_YEARS = 10
+
+# Change feed entries read per round trip while catching up
+REFRESH_CHUNK_SIZE = 5000
+
+
+def _grown(array, capacity, fill):
+    grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class MatchIndex:
+    """Feature arrays of every worker, scored with ``match``"""
+
+    def __init__(self, capacity=1024):
+        self.lock = threading.Lock()
+        self.cursor = None
+        # Worker id -> row; rows of deleted workers are reused
+        self.rows = {}
+        self.free_rows = []
+        self.size = 0
+        # Lowercased language -> column of ``spoken``
+        self.languages = {}
+
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.available = np.zeros(capacity, dtype=bool)
+        self.profession = np.full(capacity, -1, dtype=np.int16)
+        self.nationality = np.full(capacity, -1, dtype=np.int16)
+        self.experience = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.salary = np.full(capacity, np.nan, dtype=np.float64)
+        self.spoken = np.zeros((capacity, 0), dtype=bool)
+
+    @property
+    def capacity(self):
+        return len(self.ids)
+
+    def grow(self):
+        capacity = self.capacity * 2
+        self.ids = _grown(self.ids, capacity, -1)
+        self.available = _grown(self.available, capacity, False)
+        self.profession = _grown(self.profession, capacity, -1)
+        self.nationality = _grown(self.nationality, capacity, -1)
+        self.experience = _grown(self.experience, capacity, 0)
+        self.age = _grown(self.age, capacity, 0)
+        self.salary = _grown(self.salary, capacity, np.nan)
+        self.spoken = _grown(self.spoken, capacity, False)
+
+    def language_column(self, key):
+        column = self.languages.get(key)
+        if column is None:
+            column = self.languages[key] = self.spoken.shape[1]
+            self.spoken = np.hstack([self.spoken, np.zeros((self.capacity, 1), dtype=bool)])
+        return column
+
+    def upsert(self, worker):
+        row = self.rows.get(worker.pk)
+        if row is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+            else:
+                if self.size == self.capacity:
+                    self.grow()
+                row = self.size
+                self.size += 1
+            self.rows[worker.pk] = row
+
+        self.ids[row] = worker.pk
+        self.available[row] = worker.status == 'Available'
+        self.profession[row] = PROFESSION_CODES.get(worker.profession, -1)
+        self.nationality[row] = NATIONALITY_CODES.get(worker.nationality, -1)
+        self.experience[row] = worker.experience_years
+        self.age[row] = worker.age
+        self.salary[row] = np.nan if worker.salary_expectation is None else float(worker.salary_expectation)
+        columns = [self.language_column(key) for key in split_tags(worker.languages_spoken)]
+        self.spoken[row] = False
+        self.spoken[row, columns] = True
+
+    def remove(self, worker_id):
+        row = self.rows.pop(worker_id, None)
+        if row is None:
+            return
+        self.ids[row] = -1
+        self.available[row] = False
+        self.free_rows.append(row)
+
+    def refresh(self, queryset=None):
+        """Apply the worker saves and deletes made since the last refresh"""
+        queryset = (queryset if queryset is not None else Worker.objects.all()).only(*INDEX_FIELDS)
+        while True:
+            page = read_changes(queryset, self.cursor, REFRESH_CHUNK_SIZE)
+            for worker in page.changed:
+                self.upsert(worker)
+            for worker_id in page.deleted:
+                self.remove(worker_id)
+            self.cursor = decode_cursor(page.cursor)
+            if not page.has_more:
+                return
+
+    def scores(self, rows, profession=None, languages=None, budget=None, min_experience=None,
+               nationalities=None, min_age=None, max_age=None):
+        """Score in 0..1 of each of ``rows``, the weighted mean of the requested parts"""
+        total = np.zeros(len(rows), dtype=np.float64)
+        weight = 0.0
+
+        def add(part, value):
+            nonlocal total, weight
+            total += WEIGHTS[part] * value
+            weight += WEIGHTS[part]
+
+        if languages:
+            columns = [self.languages[key] for key in languages if key in self.languages]
+            spoken = self.spoken[np.ix_(rows, columns)].sum(axis=1) if columns else 0
+            add('languages', spoken / len(languages))
+        if budget is not None:
+            salary = self.salary[rows]
+            over_budget = np.clip(1 - (salary - budget) / (budget * BUDGET_TOLERANCE), 0, 1)
+            add('budget', np.where(np.isnan(salary), UNKNOWN_SALARY_SCORE, over_budget))
+        target = min_experience or DEFAULT_EXPERIENCE_TARGET
+        add('experience', np.clip(self.experience[rows] / target, 0, 1))
+        if nationalities:
+            codes = [NATIONALITY_CODES[value] for value in nationalities]
+            add('nationality', np.isin(self.nationality[rows], codes))
+        if min_age is not None or max_age is not None:
+            age = self.age[rows]
+            below = np.maximum((min_age if min_age is not None else -np.inf) - age, 0)
+            above = np.maximum(age - (max_age if max_age is not None else np.inf), 0)
+            add('age', np.clip(1 - (below + above) / AGE_TOLERANCE_YEARS, 0, 1))
+        return total / weight
+
+    def match(self, limit=10, queryset=None, **requirements):
+        """``(matches, candidates)``: the best ``limit`` (worker id, score) pairs and how many were scored.
+
+        Only available workers of the requested profession are candidates;
+        the other requirements rank them. Ties go to the lower id.
+        """
+        with self.lock:
+            self.refresh(queryset)
+            candidates = self.available[:self.size].copy()
+            profession = requirements.get('profession')
+            if profession:
+                candidates &= self.profession[:self.size] == PROFESSION_CODES[profession]
+            rows = np.flatnonzero(candidates)
+            scores = self.scores(rows, **requirements)
+            ids = self.ids[rows]
+
+        if len(rows) > limit:
+            # Everything tied with the k-th best score, so ties are broken by id below
+            threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= threshold
+            ids, scores = ids[keep], scores[keep]
+        order = np.lexsort((ids, -scores))[:limit]
+        return [(int(ids[i]), float(scores[i])) for i in order], len(rows)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_match_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MatchIndex()
+        return _index
@@ -0,0 +1,208 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+``api.middleware.RequestMetricsMiddleware`` times every request and records
+it under the resolved URL name (``worker-list``, ``booking-create``, ...):
+latency, response size, and the number and duration of database queries.
+Serializers and renderers add their time to the request being measured
+through ``measure('serialization')``. ``GET /metrics`` renders the histograms
+for a Prometheus scraper.
+
+The registry lives in process memory, so each server process reports its
+own series; scrape every process, or run one. Queries made by the async ORM
+run on other threads and are not counted, as with ``QueryBudgetMixin``.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .mixins import QueryCounter
+
+
+slow_request_logger = logging.getLogger('api.metrics.slow')
+
+LABEL_NAMES = ('view', 'method', 'status')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts, sum, count]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            label_text = format_labels(labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+def format_labels(values):
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for value in values
+    )
+    return ','.join(f'{name}="{value}"' for name, value in zip(LABEL_NAMES, escaped))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = Histogram(
+            'workershub_http_request_duration_seconds', 'Time spent handling the request.', LATENCY_BUCKETS
+        )
+        self.queries = Histogram(
+            'workershub_http_request_db_queries', 'Database queries run by the request.', QUERY_COUNT_BUCKETS
+        )
+        self.query_time = Histogram(
+            'workershub_http_request_db_duration_seconds', 'Time spent in database queries.', LATENCY_BUCKETS
+        )
+        self.serialization = Histogram(
+            'workershub_http_request_serialization_seconds', 'Time spent serializing and rendering the response.',
+            LATENCY_BUCKETS,
+        )
+        self.size = Histogram(
+            'workershub_http_response_size_bytes', 'Size of the response body; streamed bodies are not measured.',
+            SIZE_BUCKETS,
+        )
+
+    def record(self, labels, measurement):
+        with self.lock:
+            self.latency.observe(labels, measurement.duration)
+            if measurement.queries is not None:
+                self.queries.observe(labels, measurement.queries.count)
+                self.query_time.observe(labels, measurement.queries.seconds)
+            self.serialization.observe(labels, measurement.timings.get('serialization', 0.0))
+            if measurement.size is not None:
+                self.size.observe(labels, measurement.size)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for histogram in (self.latency, self.queries, self.query_time, self.serialization, self.size):
+                lines += histogram.render()
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.__init__()
+
+
+registry = Registry()
+
+
+class QueryTimer(QueryCounter):
+    """``QueryCounter`` that also records how long each query took"""
+
+    def __init__(self):
+        super().__init__()
+        self.durations = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+    @property
+    def seconds(self):
+        return sum(self.durations)
+
+
+class Measurement:
+    """What one request cost; ``queries`` is None when they could not be counted"""
+
+    def __init__(self, queries=None):
+        self.queries = queries
+        self.timings = {}
+        self.duration = 0.0
+        self.size = None
+
+
+_current = ContextVar('request_measurement', default=None)
+
+
+@contextmanager
+def measuring(queries=None):
+    measurement = Measurement(queries)
+    token = _current.set(measurement)
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.duration = time.perf_counter() - start
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Add the time spent in the block to ``name`` of the request being measured"""
+    measurement = _current.get()
+    if measurement is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        measurement.timings[name] = measurement.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class SerializationTimingMixin:
+    """Count the serializer's ``to_representation`` as serialization time"""
+
+    def to_representation(self, instance):
+        with measure('serialization'):
+            return super().to_representation(instance)
+
+
+def log_slow_request(request, labels, measurement):
+    threshold = settings.SLOW_REQUEST_SECONDS
+    if not threshold or measurement.duration < threshold:
+        return
+    queries = measurement.queries
+    lines = [
+        f'Slow request: {request.method} {request.get_full_path()} ({labels[0]}) '
+        f'took {measurement.duration:.3f}s, status {labels[2]}'
+    ]
+    if queries is not None:
+        lines.append(f'{queries.count} queries in {queries.seconds:.3f}s:')
+        lines += [f'  [{duration * 1000:.1f}ms] {sql}' for sql, duration in zip(queries.queries, queries.durations)]
+    slow_request_logger.warning('\n'.join(lines))
+
+
+def metrics_view(request):
+    """The collected metrics in the Prometheus text exposition format"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
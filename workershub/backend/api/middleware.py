@@ -0,0 +1,109 @@
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import QueryTimer, log_slow_request, measuring, registry
+from .routers import request_routing
+
+
+class PrimaryStickinessMiddleware:
+    """Keep a client's reads on the primary for a while after it writes.
+
+    A request that wrote through ``api.routers.ReplicaRouter`` gets a cookie
+    holding the time its pin expires; requests carrying an unexpired one
+    read from the primary. Unused when no replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_routing(pinned=self.is_pinned(request)) as wrote:
+            response = self.get_response(request)
+            if wrote():
+                self.pin(response)
+        return response
+
+    async def __acall__(self, request):
+        with request_routing(pinned=self.is_pinned(request)) as wrote:
+            response = await self.get_response(request)
+            if wrote():
+                self.pin(response)
+        return response
+
+    def is_pinned(self, request):
+        try:
+            until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        now = time.time()
+        # A forged far-future value must not pin a client for good
+        return now < until <= now + settings.REPLICA_STICKY_SECONDS
+
+    def pin(self, response):
+        seconds = settings.REPLICA_STICKY_SECONDS
+        # Rounded down, as is_pinned rejects anything past now + seconds
+        until = math.floor((time.time() + seconds) * 1000) / 1000
+        response.set_cookie(
+            self.cookie_name, f'{until:.3f}', max_age=seconds, httponly=True, samesite='Lax'
+        )
+
+
+class RequestMetricsMiddleware:
+    """Record each request's latency, queries and response size in ``api.metrics``.
+
+    Requests are labelled with their URL name, so ``/api/workers/1/`` and
+    ``/api/workers/2/`` share a series. Database queries are only counted for
+    requests served synchronously. Unused when ``METRICS_ENABLED`` is False.
+    """
+    sync_capable = True
+    async_capable = True
+    skipped_url_names = {'metrics'}
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryTimer() as queries, measuring(queries) as measurement:
+            response = self.get_response(request)
+            self.measure_response(response, measurement)
+        self.record(request, response, measurement)
+        return response
+
+    async def __acall__(self, request):
+        with measuring() as measurement:
+            response = await self.get_response(request)
+            self.measure_response(response, measurement)
+        self.record(request, response, measurement)
+        return response
+
+    def measure_response(self, response, measurement):
+        if not response.streaming:
+            measurement.size = len(response.content)
+
+    def record(self, request, response, measurement):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        if view in self.skipped_url_names:
+            return
+        labels = (view, request.method, response.status_code)
+        registry.record(labels, measurement)
+        log_slow_request(request, labels, measurement)
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+SEARCH_COLUMNS = 'name, profession, nationality, skills, languages_spoken'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE api_worker_fts USING fts5({SEARCH_COLUMNS}, "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO api_worker_fts (rowid, {SEARCH_COLUMNS}) '
+            f'SELECT id, {SEARCH_COLUMNS} FROM api_worker'
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE api_worker ADD FULLTEXT INDEX worker_search_ft ({SEARCH_COLUMNS})')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE api_worker_fts')
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE api_worker DROP INDEX worker_search_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_worker_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_worker_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worker',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of image, see api.images'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# Frozen copy of the parsing in api.tags at the time of this migration
+TAG_SEPARATORS = re.compile(r'[,;\n]')
+
+TAG_FIELDS = {
+    'languages_spoken': 'language_tags',
+    'skills': 'skill_tags',
+}
+
+
+def split_tags(text):
+    tags = {}
+    for part in TAG_SEPARATORS.split(text or ''):
+        name = ' '.join(part.split())[:100]
+        if name:
+            tags.setdefault(name.lower(), name)
+    return tags
+
+
+def collation_key(key):
+    # Accent- and case-insensitive collations (MySQL's default) may return another spelling
+    decomposed = unicodedata.normalize('NFKD', key)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def sync_tags(apps, workers):
+    Worker = apps.get_model('api', 'Worker')
+    for source_field, relation in TAG_FIELDS.items():
+        m2m = Worker._meta.get_field(relation)
+        Tag = m2m.related_model
+        through = m2m.remote_field.through
+        worker_column = f'{m2m.m2m_field_name()}_id'
+        tag_column = f'{m2m.m2m_reverse_field_name()}_id'
+
+        parsed = {worker.pk: split_tags(getattr(worker, source_field)) for worker in workers}
+        names = {}
+        for tags in parsed.values():
+            names.update(tags)
+
+        tag_ids = {}
+        if names:
+            Tag.objects.bulk_create([Tag(key=key, name=name) for key, name in names.items()], ignore_conflicts=True)
+            tag_ids = {
+                collation_key(key): tag_id
+                for key, tag_id in Tag.objects.filter(key__in=names).values_list('key', 'id')
+            }
+
+        through.objects.filter(**{f'{worker_column}__in': list(parsed)}).delete()
+        through.objects.bulk_create([
+            through(**{worker_column: worker_id, tag_column: tag_ids[collation_key(key)]})
+            for worker_id, tags in parsed.items()
+            for key in tags
+        ], ignore_conflicts=True)
+
+
+def populate_tags(apps, schema_editor):
+    Worker = apps.get_model('api', 'Worker')
+    workers = Worker.objects.only('id', 'languages_spoken', 'skills').order_by('pk')
+    batch = []
+    for worker in workers.iterator(chunk_size=2000):
+        batch.append(worker)
+        if len(batch) == 2000:
+            sync_tags(apps, batch)
+            batch = []
+    if batch:
+        sync_tags(apps, batch)
+
+
+def clear_tags(apps, schema_editor):
+    apps.get_model('api', 'Language').objects.all().delete()
+    apps.get_model('api', 'Skill').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_language_skill_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, clear_tags),
+    ]
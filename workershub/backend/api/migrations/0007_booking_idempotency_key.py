@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_populate_language_skill_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingrequest',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text='Idempotency-Key header of the request that created this booking', max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_booking_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['salary_expectation'], name='worker_salary_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:16
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def populate_rollups(apps, schema_editor):
+    # Frozen copy of api.rollups.rebuild_rollups at the time of this migration
+    using = schema_editor.connection.alias
+    BookingRequest = apps.get_model('api', 'BookingRequest')
+    BookingRollup = apps.get_model('api', 'BookingRollup')
+    # The last change to an approved request is the best record of its approval
+    BookingRequest.objects.using(using).filter(status='Approved').update(approved_at=F('updated_at'))
+
+    groups = defaultdict(lambda: [0, 0.0])
+    rows = (
+        BookingRequest.objects.using(using).order_by()
+        .values_list('created_at', 'status', 'worker__profession', 'worker__nationality', 'approved_at')
+    )
+    for created_at, status, profession, nationality, approved_at in rows.iterator(chunk_size=5000):
+        group = groups[(timezone.localdate(created_at), status, profession, nationality)]
+        group[0] += 1
+        if status == 'Approved' and approved_at is not None:
+            group[1] += (approved_at - created_at).total_seconds()
+
+    BookingRollup.objects.using(using).all().delete()
+    BookingRollup.objects.using(using).bulk_create([
+        BookingRollup(day=day, status=status, profession=profession, nationality=nationality,
+                      count=count, approval_seconds=seconds)
+        for (day, status, profession, nationality), (count, seconds) in groups.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_worker_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingrequest',
+            name='approved_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the request was last approved', null=True),
+        ),
+        migrations.CreateModel(
+            name='BookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], max_length=20)),
+                ('profession', models.CharField(choices=[('Housemaid', 'Housemaid'), ('Cleaner', 'Cleaner'), ('Cook', 'Cook'), ('Nanny', 'Nanny'), ('Caregiver', 'Caregiver'), ('Driver', 'Driver'), ('Gardener', 'Gardener'), ('Other', 'Other')], max_length=50)),
+                ('nationality', models.CharField(choices=[('Filipino', 'Filipino'), ('Indonesian', 'Indonesian'), ('Indian', 'Indian'), ('Sri Lankan', 'Sri Lankan'), ('Ethiopian', 'Ethiopian'), ('Kenyan', 'Kenyan'), ('Bangladeshi', 'Bangladeshi'), ('Nepalese', 'Nepalese'), ('Other', 'Other')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('approval_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'profession', 'nationality'), name='booking_rollup_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_booking_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerSearchEntry',
+            fields=[
+                ('worker', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.worker')),
+                ('document', models.TextField(db_column='api_worker_fts')),
+            ],
+            options={
+                'db_table': 'api_worker_fts',
+                'managed': False,
+            },
+        ),
+    ]
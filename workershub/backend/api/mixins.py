@@ -0,0 +1,140 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """``execute_wrapper`` hook that counts queries on every database alias"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+class QueryBudgetMixin:
+    """Check each request against a declared number of database queries.
+
+    ``query_budget`` is either an int or a dict of HTTP method to int. Going
+    over budget is logged, or raises ``QueryBudgetExceeded`` when
+    ``settings.QUERY_BUDGET_ACTION`` is ``'raise'``; ``'off'`` disables
+    counting.
+    """
+    query_budget = None
+
+    def get_query_budget(self, request):
+        if isinstance(self.query_budget, dict):
+            return self.query_budget.get(request.method)
+        return self.query_budget
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget(request)
+        action = getattr(settings, 'QUERY_BUDGET_ACTION', 'log')
+        if budget is None or action == 'off':
+            return super().dispatch(request, *args, **kwargs)
+
+        with QueryCounter() as counter:
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > budget:
+            message = (
+                f'{type(self).__name__} {request.method} {request.path} ran '
+                f'{counter.count} queries, budget is {budget}'
+            )
+            if action == 'raise':
+                raise QueryBudgetExceeded(message + '\n' + '\n'.join(counter.queries))
+            logger.warning(message)
+        return response
+
+
+class SparseFieldsetMixin:
+    """Let reads pick serializer fields with ``?fields=a,b`` or ``?exclude=a,b``.
+
+    The selection is passed to the serializer as ``fields``/``exclude`` and
+    the columns the remaining fields read are pushed into the queryset with
+    ``only()``. Writes always use the full serializer.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+    # Always loaded so ordering and keyset cursors never hit a deferred field
+    always_loaded_fields = ['id', 'created_at']
+
+    def get_field_selection(self):
+        """``(fields, exclude)`` from the query string; either may be None"""
+        if hasattr(self, '_field_selection'):
+            return self._field_selection
+        selection = [None, None]
+        if self.request.method in SAFE_METHODS:
+            available = set(self.get_serializer_class()().fields)
+            for index, param in enumerate((self.fields_query_param, self.exclude_query_param)):
+                value = self.request.query_params.get(param)
+                if value is None:
+                    continue
+                names = [name.strip() for name in value.split(',') if name.strip()]
+                unknown = [name for name in names if name not in available]
+                if unknown:
+                    raise ValidationError({param: [f'Unknown field: {name}' for name in unknown]})
+                selection[index] = names
+        self._field_selection = tuple(selection)
+        return self._field_selection
+
+    def get_serializer(self, *args, **kwargs):
+        fields, exclude = self.get_field_selection()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if exclude is not None:
+            kwargs.setdefault('exclude', exclude)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_field_selection() == (None, None):
+            return queryset
+        columns = self.get_serializer().get_columns()
+        if columns is None:
+            return queryset
+        model = queryset.model
+        for name in list(queryset.query.order_by) + self.always_loaded_fields:
+            name = str(name).lstrip('-')
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            columns.add(name)
+
+        # A relation must be loaded to be followed by select_related
+        related = {column.split('__')[0] for column in columns if '__' in column}
+        columns |= related
+        if isinstance(queryset.query.select_related, dict):
+            keep = [name for name in queryset.query.select_related if name in related]
+            queryset = queryset.select_related(None)
+            if keep:
+                queryset = queryset.select_related(*keep)
+        return queryset.only(*sorted(columns))
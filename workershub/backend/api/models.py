@@ -2,6 +2,27 @@ from django.db import models
 from django.core.validators import RegexValidator
 
 
+class Tag(models.Model):
+    """Normalized value split out of a comma-separated worker field"""
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True, help_text='Lowercased name used for matching')
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Language(Tag):
+    pass
+
+
+class Skill(Tag):
+    pass
+
+
 class Worker(models.Model):
     STATUS_CHOICES = [
         ('Available', 'Available'),
@@ -60,7 +81,9 @@ class Worker(models.Model):
     age = models.IntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Available')
     image = models.ImageField(upload_to='workers/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized copies of image, see api.images')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # Additional fields for better filtering
     experience_years = models.IntegerField(default=0, help_text='Years of experience')
@@ -68,13 +91,51 @@ class Worker(models.Model):
     skills = models.TextField(blank=True, help_text='Special skills or certifications')
     salary_expectation = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     
+    # Tags parsed from languages_spoken and skills, kept in sync by api.tags
+    language_tags = models.ManyToManyField(Language, related_name='workers', blank=True)
+    skill_tags = models.ManyToManyField(Skill, related_name='workers', blank=True)
+    
     class Meta:
         ordering = ['-created_at']
+        # Composite indexes follow the WorkerListView filter combinations, each
+        # ending in created_at so the default ordering is read off the index
+        indexes = [
+            models.Index(fields=['-created_at'], name='worker_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='worker_status_created_idx'),
+            models.Index(fields=['status', 'profession', '-created_at'], name='worker_status_prof_created_idx'),
+            models.Index(fields=['status', 'nationality', '-created_at'], name='worker_status_nat_created_idx'),
+            models.Index(fields=['profession', '-created_at'], name='worker_prof_created_idx'),
+            models.Index(fields=['profession', 'nationality', '-created_at'], name='worker_prof_nat_created_idx'),
+            models.Index(fields=['nationality', '-created_at'], name='worker_nat_created_idx'),
+            models.Index(fields=['religion', '-created_at'], name='worker_religion_created_idx'),
+            models.Index(fields=['marital_status', '-created_at'], name='worker_marital_created_idx'),
+            models.Index(fields=['age'], name='worker_age_idx'),
+            models.Index(fields=['experience_years'], name='worker_experience_idx'),
+            models.Index(fields=['salary_expectation'], name='worker_salary_idx'),
+            models.Index(fields=['updated_at'], name='worker_updated_idx'),
+        ]
         
     def __str__(self):
         return f"{self.name} - {self.profession} ({self.nationality})"
 
 
+class WorkerSearchEntry(models.Model):
+    """Row of the SQLite FTS5 table ``api.search.SQLiteFTSBackend`` joins to search workers.
+
+    The table is created by migration 0003 on SQLite only and is never
+    written through this model; ``document`` is FTS5's hidden column named
+    after the table, which ``MATCH`` and ``bm25()`` take.
+    """
+    worker = models.OneToOneField(
+        Worker, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_entry'
+    )
+    document = models.TextField(db_column='api_worker_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'api_worker_fts'
+
+
 class BookingRequest(models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -94,13 +155,63 @@ class BookingRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    approved_at = models.DateTimeField(blank=True, null=True, editable=False, help_text='When the request was last approved')
     
     # Additional fields
     preferred_start_date = models.DateField(blank=True, null=True)
     contract_duration = models.CharField(max_length=50, blank=True, null=True, help_text='e.g., 1 year, 6 months')
+    idempotency_key = models.CharField(
+        max_length=64, unique=True, blank=True, null=True, editable=False,
+        help_text='Idempotency-Key header of the request that created this booking'
+    )
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='booking_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='booking_status_created_idx'),
+            models.Index(fields=['-updated_at'], name='booking_updated_idx'),
+        ]
         
     def __str__(self):
         return f"{self.full_name} - {self.worker.name} ({self.status})"
+
+
+class BookingRollup(models.Model):
+    """Booking requests created on one day, grouped by current status and worker.
+
+    Kept current by ``api.rollups`` as bookings are created, change status or
+    are deleted; ``approval_seconds`` sums the creation-to-approval time of the
+    Approved rows counted here.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=BookingRequest.STATUS_CHOICES)
+    profession = models.CharField(max_length=50, choices=Worker.PROFESSION_CHOICES)
+    nationality = models.CharField(max_length=50, choices=Worker.NATIONALITY_CHOICES)
+    count = models.IntegerField(default=0)
+    approval_seconds = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status', 'profession', 'nationality'], name='booking_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.profession}/{self.nationality}: {self.count}"
+
+
+class Tombstone(models.Model):
+    """Marker left behind by a deleted row so the change feed can report the delete"""
+    model = models.CharField(max_length=100, help_text='app_label.model_name of the deleted row')
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
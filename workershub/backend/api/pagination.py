@@ -0,0 +1,244 @@
+"""
+Pagination for the list endpoints.
+
+Page-number pagination stays the default. Sending a ``cursor`` parameter
+(empty for the first page) switches a request to keyset pagination, which
+seeks on the ordering columns plus ``created_at`` and ``id`` instead of
+counting the table and scanning past an OFFSET. Keyset pages can ask for
+``count=exact`` or ``count=estimated``; by default they skip the count.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """Row count from planner statistics where the backend offers one.
+
+    MySQL's EXPLAIN row estimate is used for the driving table; other backends
+    fall back to an exact ``COUNT(*)``.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}', params)
+        columns = [column[0] for column in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if not plan or plan[0].get('rows') is None:
+        return queryset.count()
+    filtered = plan[0].get('filtered') or 100
+    return int(plan[0]['rows'] * filtered / 100)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Django paginator counting with ``estimate_count``, for the admin changelists"""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class KeysetPagination:
+    """Seek pagination over (ordering fields..., created_at, id).
+
+    Cursors carry the boundary row's key values, the direction of travel and
+    the ordering they were issued for, so they stay valid while rows are
+    inserted or removed elsewhere in the list. NULL sorts as the smallest
+    value, which matches the MySQL and SQLite defaults.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    tiebreak_fields = ['-created_at', '-id']
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, queryset):
+        ordering = [str(field) for field in (queryset.query.order_by or queryset.model._meta.ordering)]
+        names = {field.lstrip('-') for field in ordering}
+        return ordering + [field for field in self.tiebreak_fields if field.lstrip('-') not in names]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return payload['o'], payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_field(self, model, name):
+        """Model field behind an ordering key, or None for annotations such as search_rank"""
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def encode_cursor(self, instance, reverse):
+        values = []
+        for field_name in self.ordering:
+            name = field_name.lstrip('-')
+            # Pages may hold model instances or values() dicts
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if value is not None and self.get_field(self.model, name) is not None:
+                value = str(value)
+            values.append(value)
+        payload = {
+            'o': self.ordering,
+            'v': values,
+            'r': int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def seek_filter(self, model, ordering, values, reverse):
+        """Rows strictly after ``values`` in ``ordering`` (before them when reversed)"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field_name, raw in zip(ordering, values):
+            name = field_name.lstrip('-')
+            field = self.get_field(model, name)
+            value = raw if raw is None or field is None else field.to_python(raw)
+            descending = field_name.startswith('-') != reverse
+
+            if value is None:
+                after = Q(**{f'{name}__isnull': False}) if not descending else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if descending and (field is None or field.null):
+                    after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+        return condition
+
+    def get_page_queryset(self, queryset, request):
+        """``queryset`` seeked past the cursor, ordered and sliced to one row more than a page"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        self.count_mode = request.query_params.get(self.count_query_param)
+        self.count = None
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = False
+        if self.cursor is not None:
+            ordering, values, self.reverse = self.cursor
+            if ordering != self.ordering or len(values) != len(ordering):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(self.seek_filter(queryset.model, ordering, values, self.reverse))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        order_by = self.ordering
+        if self.reverse:
+            order_by = [field[1:] if field.startswith('-') else f'-{field}' for field in order_by]
+        return queryset.order_by(*order_by)[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = has_more if self.reverse else self.cursor is not None
+        return rows
+
+    def paginate_queryset(self, queryset, request):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if self.count_mode == 'exact':
+            self.count = queryset.count()
+        elif self.count_mode == 'estimated':
+            self.count = estimate_count(queryset)
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if self.count_mode == 'exact':
+            self.count = await queryset.acount()
+        elif self.count_mode == 'estimated':
+            self.count = await sync_to_async(estimate_count)(queryset)
+        return self.set_page([row async for row in page_queryset])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+
+class StandardPagination(PageNumberPagination):
+    """Page-number pagination with opt-in keyset mode via ``?cursor=``"""
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class(self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: counts and fetches with the async ORM"""
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class(self.get_page_size(request))
+            return await self.keyset.apaginate_queryset(queryset, request)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property; filling it skips the sync COUNT
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.page.object_list = [row async for row in self.page.object_list]
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
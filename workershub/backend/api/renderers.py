@@ -0,0 +1,51 @@
+import re
+
+try:
+    import orjson
+except ImportError:  # optional; DRF's json-based renderer is used instead
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import measure
+
+
+# orjson and the json module only format a float differently when one of
+# them uses an exponent (1e16 / 1e+16, 0.00002 / 2e-05); output with either
+# form is rendered again by JSONRenderer. Matches inside strings just cost
+# the slower path.
+FLOAT_FORMAT_MISMATCH = re.compile(rb'\d[eE]|0\.0000')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson when it is installed.
+
+    The output is byte for byte what ``JSONRenderer`` produces with the
+    default compact, unicode settings; anything orjson cannot encode the same
+    way (indented output, non-string keys, oversized ints, floats written
+    with an exponent) goes through ``JSONRenderer`` instead. NaN and infinity
+    render as null where ``JSONRenderer`` would raise.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('serialization'):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if data is None or orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                # Dates go through DRF's encoder, which formats them differently
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if FLOAT_FORMAT_MISMATCH.search(content):
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these two so the output is also valid JavaScript
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,156 @@
+"""
+Daily booking rollups behind the booking time-series endpoint.
+
+``BookingRollup`` has one row per (creation day, status, worker profession,
+worker nationality). Booking saves and deletes in ``api.signals`` and bulk
+transitions in ``api.transitions`` describe each change as signed deltas,
+which ``RollupDeltas.apply`` adds with one upsert inside the writing
+transaction, so the rollups commit or roll back together with the bookings.
+``booking_series`` reads the rollups only, never the booking table.
+
+Rows are grouped by the worker's profession and nationality when the change
+is recorded; ``manage.py backfill_booking_rollups`` rebuilds every row from
+the booking table after bulk imports or worker reclassifications.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import connections
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import BookingRequest, BookingRollup, Worker
+
+
+ROLLUP_KEY_FIELDS = ['day', 'status', 'profession', 'nationality']
+
+GROUP_CHOICES = {
+    'status': BookingRequest.STATUS_CHOICES,
+    'profession': Worker.PROFESSION_CHOICES,
+    'nationality': Worker.NATIONALITY_CHOICES,
+}
+
+# Start of the period a rollup day belongs to, per granularity
+PERIOD_EXPRESSIONS = {
+    'day': lambda: F('day'),
+    'week': lambda: TruncWeek('day'),
+    'month': lambda: TruncMonth('day'),
+}
+
+
+class RollupDeltas:
+    """Signed changes to rollup rows, applied together"""
+    batch_size = 500
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, 0.0])
+
+    def add(self, created_at, status, profession, nationality, approved_at=None, sign=1):
+        """Count one booking in its group, or take it out again with ``sign=-1``"""
+        delta = self.deltas[(timezone.localdate(created_at), status, profession, nationality)]
+        delta[0] += sign
+        if status == 'Approved' and approved_at is not None:
+            delta[1] += sign * (approved_at - created_at).total_seconds()
+
+    def remove(self, created_at, status, profession, nationality, approved_at=None):
+        self.add(created_at, status, profession, nationality, approved_at, sign=-1)
+
+    def apply(self, using='default', rollup_model=BookingRollup):
+        """Add the deltas to the rollup rows, creating missing ones, with one statement per batch"""
+        rows = [key + tuple(delta) for key, delta in self.deltas.items() if delta != [0, 0.0]]
+        connection = connections[using]
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            sql, params = upsert_sql(connection, rollup_model._meta.db_table, batch)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+        self.deltas.clear()
+
+
+def upsert_sql(connection, table, rows):
+    quote = connection.ops.quote_name
+    columns = ROLLUP_KEY_FIELDS + ['count', 'approval_seconds']
+    placeholders = ', '.join(['(%s)' % ', '.join(['%s'] * len(columns))] * len(rows))
+    params = []
+    for day, *rest in rows:
+        params += [connection.ops.adapt_datefield_value(day), *rest]
+
+    insert = 'INSERT INTO %s (%s) VALUES %s' % (quote(table), ', '.join(map(quote, columns)), placeholders)
+    count, seconds = quote('count'), quote('approval_seconds')
+    if connection.vendor == 'mysql':
+        return (
+            f'{insert} ON DUPLICATE KEY UPDATE {count} = {count} + VALUES({count}), '
+            f'{seconds} = {seconds} + VALUES({seconds})'
+        ), params
+    # SQLite and PostgreSQL
+    return (
+        f'{insert} ON CONFLICT ({", ".join(map(quote, ROLLUP_KEY_FIELDS))}) DO UPDATE SET '
+        f'{count} = {quote(table)}.{count} + excluded.{count}, '
+        f'{seconds} = {quote(table)}.{seconds} + excluded.{seconds}'
+    ), params
+
+
+def rebuild_rollups(using='default', chunk_size=5000):
+    """Replace every rollup row with counts recomputed from the booking table"""
+    deltas = RollupDeltas()
+    rows = (
+        BookingRequest.objects.using(using).order_by()
+        .values_list('created_at', 'status', 'worker__profession', 'worker__nationality', 'approved_at')
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        deltas.add(*row)
+    BookingRollup.objects.using(using).all().delete()
+    groups = len(deltas.deltas)
+    deltas.apply(using)
+    return groups
+
+
+def period_starts(start, end, granularity):
+    """Start date of every period overlapping ``start``..``end``"""
+    if granularity == 'week':
+        current = start - timedelta(days=start.weekday())
+    elif granularity == 'month':
+        current = start.replace(day=1)
+    else:
+        current = start
+    while current <= end:
+        yield current
+        if granularity == 'week':
+            current += timedelta(days=7)
+        elif granularity == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1)
+
+
+def booking_series(start, end, granularity='day', group_by='status'):
+    """Booking counts and approval latency per period for bookings created between ``start`` and ``end``"""
+    rows = (
+        BookingRollup.objects.filter(day__range=(start, end)).order_by()
+        .annotate(period=PERIOD_EXPRESSIONS[granularity]())
+        .values('period', group_by)
+        .annotate(
+            total=Sum('count'),
+            approved=Sum('count', filter=Q(status='Approved')),
+            approval_seconds=Sum('approval_seconds'),
+        )
+    )
+    values = [value for value, _ in GROUP_CHOICES[group_by]]
+    series = {
+        period: {'period': period, 'total': 0, 'counts': dict.fromkeys(values, 0), 'approved': 0, 'approval_seconds': 0.0}
+        for period in period_starts(start, end, granularity)
+    }
+    for row in rows:
+        point = series[row['period']]
+        point['total'] += row['total']
+        point['counts'][row[group_by]] = point['counts'].get(row[group_by], 0) + row['total']
+        point['approved'] += row['approved'] or 0
+        point['approval_seconds'] += row['approval_seconds'] or 0
+
+    points = []
+    for point in series.values():
+        seconds = point.pop('approval_seconds')
+        point['avg_approval_seconds'] = seconds / point['approved'] if point['approved'] else None
+        points.append(point)
+    return {'start': start, 'end': end, 'granularity': granularity, 'group_by': group_by, 'series': points}
@@ -0,0 +1,88 @@
+"""
+Read-replica routing for the ``api`` models.
+
+Reads go to a randomly chosen replica from ``settings.REPLICA_DATABASES`` and
+writes to ``default``. Reads fall back to the primary:
+
+* inside a transaction on the primary, so a transaction sees its own writes;
+* for the rest of a request once it has written anything;
+* for ``REPLICA_STICKY_SECONDS`` after a client's last write, tracked by
+  ``api.middleware.PrimaryStickinessMiddleware`` with a cookie, so a new
+  booking is never hidden from its author by replication lag.
+
+The pin lives in a context variable, so it follows a request through
+``sync_to_async`` and the async views.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+@contextmanager
+def request_routing(pinned=False):
+    """Scope one request's routing state; yields a callable reporting whether it wrote"""
+    primary_token = _use_primary.set(pinned)
+    wrote_token = _wrote.set(False)
+    try:
+        yield _wrote.get
+    finally:
+        _use_primary.reset(primary_token)
+        _wrote.reset(wrote_token)
+
+
+@contextmanager
+def use_primary():
+    """Send reads in the block to the primary, e.g. for a read-modify-write"""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def reading_from_replica():
+    """Whether reads of the api models in the current context may be served by a replica"""
+    return bool(settings.REPLICA_DATABASES) and not _use_primary.get()
+
+
+class ReplicaRouter:
+    app_label = 'api'
+
+    def __init__(self, replicas=None):
+        self.replicas = list(settings.REPLICA_DATABASES if replicas is None else replicas)
+
+    def routes(self, model):
+        return bool(self.replicas) and model._meta.app_label == self.app_label
+
+    def db_for_read(self, model, **hints):
+        if not self.routes(model):
+            return None
+        if _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        if not self.routes(model):
+            return None
+        _wrote.set(True)
+        _use_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication
+        if db in self.replicas:
+            return False
+        return None
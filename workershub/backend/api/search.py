@@ -0,0 +1,174 @@
+"""
+Full-text search backends for workers.
+
+The backend is chosen by ``settings.WORKER_SEARCH_BACKEND`` (a dotted path),
+or by database vendor when that is unset: MySQL uses the FULLTEXT index
+created in migration 0003, SQLite uses an FTS5 table kept in sync by the
+``Worker`` signals in ``api.signals``, and anything else falls back to the
+``icontains`` scan DRF's SearchFilter used to do.
+
+Every backend annotates matches with ``search_rank`` where a higher value
+means a better match, and every term is matched as a prefix.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Worker, WorkerSearchEntry
+
+
+SEARCH_FIELDS = ['name', 'profession', 'nationality', 'skills', 'languages_spoken']
+
+
+class BaseSearchBackend(ABC):
+    """Interface the search filter and signal handlers rely on"""
+
+    @abstractmethod
+    def search(self, queryset, terms):
+        """``queryset`` narrowed to workers matching every term, annotated with ``search_rank``"""
+
+    def no_matches(self, queryset):
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+    def index(self, worker):
+        """Add or refresh one worker; backends with self-maintaining indexes do nothing"""
+
+    def index_many(self, workers):
+        """Add or refresh a batch of workers, e.g. after ``bulk_create``"""
+
+    def remove(self, worker_id, using='default'):
+        """Drop one worker from the index"""
+
+    def rebuild(self, using='default'):
+        """Repopulate the whole index from the worker table"""
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Unindexed ``icontains`` matching, for databases without a full-text index"""
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in SEARCH_FIELDS:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class Match(Lookup):
+    """``column MATCH query`` against a full-text table"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+WorkerSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 virtual table keyed by worker id, ranked with bm25()"""
+    table = 'api_worker_fts'
+
+    def build_query(self, terms):
+        tokens = [token for term in terms for token in re.findall(r'\w+', term)]
+        return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+    def search(self, queryset, terms):
+        query = self.build_query(terms)
+        if not query:
+            return self.no_matches(queryset)
+        # One join to the FTS table serves both the match and its rank
+        return queryset.filter(search_entry__document__match=query).annotate(
+            search_rank=-Func(F('search_entry__document'), function='bm25', output_field=FloatField())
+        )
+
+    # Workers per DELETE, kept under SQLite's bound parameter limit
+    batch_size = 500
+
+    def index(self, worker):
+        self.index_many([worker])
+
+    def index_many(self, workers):
+        """One DELETE and one executemany INSERT per batch of workers"""
+        by_db = {}
+        for worker in workers:
+            by_db.setdefault(worker._state.db or 'default', []).append(worker)
+        insert = (
+            f'INSERT INTO {self.table} (rowid, {", ".join(SEARCH_FIELDS)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(SEARCH_FIELDS))})'
+        )
+        for using, db_workers in by_db.items():
+            with connections[using].cursor() as cursor:
+                for start in range(0, len(db_workers), self.batch_size):
+                    batch = db_workers[start:start + self.batch_size]
+                    cursor.execute(
+                        f'DELETE FROM {self.table} WHERE rowid IN ({", ".join(["%s"] * len(batch))})',
+                        [worker.pk for worker in batch],
+                    )
+                    cursor.executemany(insert, [
+                        [worker.pk] + [getattr(worker, field) or '' for field in SEARCH_FIELDS]
+                        for worker in batch
+                    ])
+
+    def remove(self, worker_id, using='default'):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [worker_id])
+
+    def rebuild(self, using='default'):
+        columns = ', '.join(SEARCH_FIELDS)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM {Worker._meta.db_table}'
+            )
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """InnoDB FULLTEXT index in boolean mode; MySQL keeps the index current itself"""
+    # Characters with meaning in boolean-mode queries
+    operators = re.compile(r'[+\-<>()~*"@]+')
+
+    def build_query(self, terms):
+        tokens = [token for term in terms for token in self.operators.sub(' ', term).split()]
+        return ' '.join(f'+{token}*' for token in tokens)
+
+    def search(self, queryset, terms):
+        query = self.build_query(terms)
+        if not query:
+            return self.no_matches(queryset)
+        match = f'MATCH ({", ".join(SEARCH_FIELDS)}) AGAINST (%s IN BOOLEAN MODE)'
+        return queryset.annotate(
+            search_rank=RawSQL(match, [query], output_field=FloatField())
+        ).filter(search_rank__gt=0)
+
+    def rebuild(self, using='default'):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'OPTIMIZE TABLE {Worker._meta.db_table}')
+
+
+VENDOR_BACKENDS = {
+    'mysql': MySQLFullTextBackend,
+    'sqlite': SQLiteFTSBackend,
+}
+
+_backends = {}
+
+
+def get_search_backend(using='default'):
+    if using not in _backends:
+        path = getattr(settings, 'WORKER_SEARCH_BACKEND', None)
+        if path:
+            backend_class = import_string(path)
+        else:
+            backend_class = VENDOR_BACKENDS.get(connections[using].vendor, LikeSearchBackend)
+        _backends[using] = backend_class()
+    return _backends[using]
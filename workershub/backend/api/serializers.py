@@ -1,29 +1,74 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from .images import VARIANT_SIZES, variant_url
+from .metrics import SerializationTimingMixin
 from .models import Worker, BookingRequest
+from .tags import split_tags
+
+
+class SparseFieldsetSerializerMixin:
+    """Accept ``fields`` and ``exclude`` keyword arguments naming the fields to keep or drop"""
+    # Model lookups each SerializerMethodField reads
+    column_dependencies = {}
 
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
 
-class WorkerSerializer(serializers.ModelSerializer):
+    def get_columns(self):
+        """Lookups for ``QuerySet.only()`` covering the remaining fields, or None if unknown"""
+        columns = set()
+        for name, field in self.fields.items():
+            if name in self.column_dependencies:
+                columns.update(self.column_dependencies[name])
+            elif field.source == '*':
+                return None
+            else:
+                columns.add(field.source.replace('.', '__'))
+        return columns
+
+
+class WorkerSerializer(SerializationTimingMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    column_dependencies = {
+        'image_url': ['image', 'image_variants'],
+        'image_variants': ['image', 'image_variants'],
+    }
     
     class Meta:
         model = Worker
         fields = [
             'id', 'name', 'passport_number', 'nationality', 'religion', 
             'profession', 'marital_status', 'age', 'status', 'image', 
-            'image_url', 'created_at', 'experience_years', 'languages_spoken', 
+            'image_url', 'image_variants', 'created_at', 'experience_years', 'languages_spoken', 
             'skills', 'salary_expectation'
         ]
         read_only_fields = ['created_at']
         
     def get_image_url(self, obj):
         if obj.image:
-            return self.context['request'].build_absolute_uri(obj.image.url)
+            return self.context['request'].build_absolute_uri(variant_url(obj, 'full'))
         return None
 
+    def get_image_variants(self, obj):
+        if not obj.image:
+            return None
+        request = self.context['request']
+        return {variant: request.build_absolute_uri(variant_url(obj, variant)) for variant in VARIANT_SIZES}
+
 
-class WorkerListSerializer(serializers.ModelSerializer):
+class WorkerListSerializer(SerializationTimingMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Lightweight serializer for worker list view"""
     image_url = serializers.SerializerMethodField()
+    column_dependencies = {'image_url': ['image', 'image_variants']}
     
     class Meta:
         model = Worker
@@ -34,11 +79,18 @@ class WorkerListSerializer(serializers.ModelSerializer):
         
     def get_image_url(self, obj):
         if obj.image:
-            return self.context['request'].build_absolute_uri(obj.image.url)
+            return self.context['request'].build_absolute_uri(variant_url(obj, 'card'))
         return None
 
+    def fast_image_url(self, row, media_url):
+        if not row['image']:
+            return None
+        variants = row['image_variants'] or {}
+        name = variants.get('card') if variants.get('source') == row['image'] else None
+        return media_url(Worker._meta.get_field('image').storage, name or row['image'])
 
-class BookingRequestSerializer(serializers.ModelSerializer):
+
+class BookingRequestSerializer(SerializationTimingMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     worker_name = serializers.CharField(source='worker.name', read_only=True)
     worker_profession = serializers.CharField(source='worker.profession', read_only=True)
     worker_nationality = serializers.CharField(source='worker.nationality', read_only=True)
@@ -54,10 +106,18 @@ class BookingRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
         
     def validate_worker(self, value):
+        if self.instance is not None and value.pk == self.instance.worker_id:
+            # The booking's own worker is Booked because of this very booking
+            return value
         if value.status != 'Available':
             raise serializers.ValidationError("This worker is not available for booking.")
         return value
 
+    def update(self, instance, validated_data):
+        """Save the booking and book or release its worker in one transaction"""
+        with transaction.atomic():
+            return super().update(instance, validated_data)
+
 
 class BookingRequestCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating booking requests"""
@@ -72,4 +132,87 @@ class BookingRequestCreateSerializer(serializers.ModelSerializer):
     def validate_worker(self, value):
         if value.status != 'Available':
             raise serializers.ValidationError("This worker is not available for booking.")
-        return value
\ No newline at end of file
+        return value
+
+    def create(self, validated_data):
+        """Reserve the worker and insert the booking in one transaction.
+
+        The worker row is locked before its status is re-checked, so of many
+        concurrent requests for the same worker exactly one moves it to
+        Booked. A retry whose idempotency key was stored while it waited for
+        the lock gets that booking back instead. Rejecting or deleting the
+        booking releases the worker again, see ``api.signals``.
+        """
+        key = validated_data.get('idempotency_key')
+        with transaction.atomic():
+            worker = Worker.objects.select_for_update().get(pk=validated_data['worker'].pk)
+            if key:
+                existing = BookingRequest.objects.filter(idempotency_key=key).first()
+                if existing is not None:
+                    existing.replayed = True
+                    return existing
+            if worker.status != 'Available':
+                raise serializers.ValidationError({'worker': ["This worker is not available for booking."]})
+            worker.status = 'Booked'
+            worker.save(update_fields=['status', 'updated_at'])
+            validated_data['worker'] = worker
+            return super().create(validated_data)
+
+
+class BookingStatusTransitionSerializer(serializers.Serializer):
+    """Input for moving many booking requests to one status"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=BookingRequest.STATUS_CHOICES)
+
+
+class BookingSeriesQuerySerializer(serializers.Serializer):
+    """Query parameters of the booking time series; the range defaults to the last 30 days"""
+    max_periods = 1000
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    group_by = serializers.ChoiceField(choices=['status', 'profession', 'nationality'], default='status')
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': ['Must not be after end.']})
+        days = (attrs['end'] - attrs['start']).days + 1
+        periods = {'day': days, 'week': days / 7, 'month': days / 28}[attrs['granularity']]
+        if periods > self.max_periods:
+            raise serializers.ValidationError({'granularity': [f'The range spans more than {self.max_periods} periods.']})
+        return attrs
+
+
+class WorkerMatchQuerySerializer(serializers.Serializer):
+    """Query parameters of worker matching; languages and nationalities are comma-separated"""
+    profession = serializers.ChoiceField(choices=Worker.PROFESSION_CHOICES, required=False)
+    languages = serializers.CharField(required=False)
+    budget = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=1, required=False)
+    min_experience = serializers.IntegerField(min_value=0, required=False)
+    nationalities = serializers.CharField(required=False)
+    min_age = serializers.IntegerField(min_value=0, required=False)
+    max_age = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate_languages(self, value):
+        return list(split_tags(value))
+
+    def validate_nationalities(self, value):
+        values = [name.strip() for name in value.split(',') if name.strip()]
+        known = {name for name, _ in Worker.NATIONALITY_CHOICES}
+        unknown = [name for name in values if name not in known]
+        if unknown:
+            raise serializers.ValidationError(f'Unknown values: {", ".join(unknown)}')
+        return values
+
+    def validate_budget(self, value):
+        return float(value)
+
+    def validate(self, attrs):
+        if attrs.get('min_age') is not None and attrs.get('max_age') is not None and attrs['min_age'] > attrs['max_age']:
+            raise serializers.ValidationError({'min_age': ['Must not be above max_age.']})
+        return attrs
@@ -0,0 +1,271 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_model_version
+from .events import booking_event, publish_on_commit, worker_event
+from .images import delete_variants, generate_variants, variants_are_current
+from .models import Worker, BookingRequest, Tombstone
+from .rollups import RollupDeltas
+from .search import SEARCH_FIELDS, get_search_backend
+from .tags import TAG_FIELDS, sync_worker_tags
+from .transitions import sync_worker_status
+from .stats import (
+    WORKER_STATS_CACHE_KEY, BOOKING_STATS_CACHE_KEY,
+    WORKER_STATS_FIELDS, BOOKING_STATS_FIELDS, invalidate_stats
+)
+
+
+# Stored values captured before each save, per model
+TRACKED_FIELDS = {
+    Worker: WORKER_STATS_FIELDS + tuple(TAG_FIELDS),
+    BookingRequest: BOOKING_STATS_FIELDS + ('approved_at',),
+}
+
+
+def _group(instance, fields):
+    return tuple(getattr(instance, field) for field in fields)
+
+
+def _deleted_with_worker(origin):
+    """Whether a booking delete is part of deleting its worker (or a worker queryset)"""
+    return isinstance(origin, Worker) or getattr(origin, 'model', None) is Worker
+
+
+def _invalidate_if_moved(key, old_group, new_group):
+    """Drop the cached counts once the transaction commits if a row changed stats group"""
+    if old_group == new_group:
+        return
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(pre_save, sender=Worker)
+@receiver(pre_save, sender=BookingRequest)
+def remember_previous_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored row's tracked values so post_save handlers can diff them"""
+    instance._previous_state = None
+    if raw or instance.pk is None:
+        return
+    fields = TRACKED_FIELDS[sender]
+    if update_fields is not None and not set(update_fields) & set(fields):
+        # None of the tracked columns are written, so none of them changes
+        instance._previous_state = {field: getattr(instance, field) for field in fields}
+        return
+    instance._previous_state = (
+        sender.objects.filter(pk=instance.pk).order_by()
+        .values(*fields)
+        .first()
+    )
+
+
+def _previous_group(instance, fields):
+    previous = getattr(instance, '_previous_state', None)
+    if previous is None:
+        return None
+    return tuple(previous[field] for field in fields)
+
+
+@receiver(pre_save, sender=BookingRequest)
+def stamp_approval(sender, instance, raw=False, **kwargs):
+    """Record when a request becomes Approved, for the approval latency rollups"""
+    if raw:
+        return
+    if instance.status != 'Approved':
+        instance.approved_at = None
+    elif instance.approved_at is None or _previous_group(instance, ('status',)) != ('Approved',):
+        instance.approved_at = timezone.now()
+
+
+@receiver(post_save, sender=Worker)
+def update_worker_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        transaction.on_commit(lambda: cache.delete(WORKER_STATS_CACHE_KEY))
+        return
+    old_group = None if created else _previous_group(instance, WORKER_STATS_FIELDS)
+    _invalidate_if_moved(WORKER_STATS_CACHE_KEY, old_group, _group(instance, WORKER_STATS_FIELDS))
+
+
+@receiver(post_delete, sender=Worker)
+def update_worker_stats_on_delete(sender, instance, **kwargs):
+    _invalidate_if_moved(WORKER_STATS_CACHE_KEY, _group(instance, WORKER_STATS_FIELDS), None)
+
+
+@receiver(post_save, sender=BookingRequest)
+def update_booking_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        transaction.on_commit(lambda: cache.delete(BOOKING_STATS_CACHE_KEY))
+        return
+    old_group = None if created else _previous_group(instance, BOOKING_STATS_FIELDS)
+    _invalidate_if_moved(BOOKING_STATS_CACHE_KEY, old_group, _group(instance, BOOKING_STATS_FIELDS))
+
+
+@receiver(post_delete, sender=BookingRequest)
+def update_booking_stats_on_delete(sender, instance, **kwargs):
+    _invalidate_if_moved(BOOKING_STATS_CACHE_KEY, _group(instance, BOOKING_STATS_FIELDS), None)
+
+
+@receiver(post_save, sender=BookingRequest)
+def update_booking_rollups_on_save(sender, instance, created, using, raw=False, **kwargs):
+    previous = None if created else getattr(instance, '_previous_state', None)
+    if raw or (previous is not None and previous['status'] == instance.status):
+        return
+    worker = instance.worker
+    deltas = RollupDeltas()
+    if previous is not None:
+        deltas.remove(instance.created_at, previous['status'], worker.profession, worker.nationality, previous['approved_at'])
+    deltas.add(instance.created_at, instance.status, worker.profession, worker.nationality, instance.approved_at)
+    deltas.apply(using)
+
+
+@receiver(post_delete, sender=BookingRequest)
+def update_booking_rollups_on_delete(sender, instance, using, origin=None, **kwargs):
+    if _deleted_with_worker(origin):
+        # Done for all of the worker's bookings at once by release_cascaded_bookings
+        return
+    worker = instance.worker
+    deltas = RollupDeltas()
+    deltas.remove(instance.created_at, instance.status, worker.profession, worker.nationality, instance.approved_at)
+    deltas.apply(using)
+
+
+@receiver(post_save, sender=Worker)
+def update_search_index_on_save(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    get_search_backend(using).index(instance)
+
+
+@receiver(post_delete, sender=Worker)
+def update_search_index_on_delete(sender, instance, using, **kwargs):
+    get_search_backend(using).remove(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_save, sender=BookingRequest)
+@receiver(post_delete, sender=Worker)
+@receiver(post_delete, sender=BookingRequest)
+def bump_response_cache_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+@receiver(post_delete, sender=Worker)
+@receiver(post_delete, sender=BookingRequest)
+def record_tombstone(sender, instance, using, origin=None, **kwargs):
+    """Leave a marker for the change feed, which cannot see deleted rows otherwise"""
+    if sender is BookingRequest and _deleted_with_worker(origin):
+        return
+    Tombstone.objects.using(using).create(model=sender._meta.label_lower, object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Worker)
+def release_cascaded_bookings(sender, instance, using, **kwargs):
+    """Take a deleted worker's bookings out of the rollups and tombstone them.
+
+    The per-booking post_delete receivers skip bookings deleted along with
+    their worker, so a cascade costs three queries per worker instead of
+    three per booking.
+    """
+    bookings = list(
+        BookingRequest.objects.using(using).filter(worker_id=instance.pk).order_by()
+        .values_list('id', 'created_at', 'status', 'approved_at')
+    )
+    if not bookings:
+        return
+    deltas = RollupDeltas()
+    for _, created_at, status, approved_at in bookings:
+        deltas.remove(created_at, status, instance.profession, instance.nationality, approved_at)
+    deltas.apply(using)
+    label = BookingRequest._meta.label_lower
+    Tombstone.objects.using(using).bulk_create([Tombstone(model=label, object_id=booking[0]) for booking in bookings])
+
+
+def _status_change(instance, created):
+    """``(changed, previous status)`` of a saved worker or booking"""
+    if created:
+        return True, None
+    previous = _previous_group(instance, ('status',))
+    if previous is None:
+        return True, None
+    return previous[0] != instance.status, previous[0]
+
+
+@receiver(post_save, sender=Worker)
+def publish_worker_status(sender, instance, created, using, raw=False, **kwargs):
+    changed, previous = _status_change(instance, created)
+    if raw or not changed:
+        return
+    publish_on_commit([worker_event(instance, previous)], using=using)
+
+
+@receiver(post_save, sender=BookingRequest)
+def publish_booking_status(sender, instance, created, using, raw=False, **kwargs):
+    changed, previous = _status_change(instance, created)
+    if raw or not changed:
+        return
+    status = instance.status
+    # The worker is only loaded if someone is subscribed
+    publish_on_commit(lambda: [booking_event(instance.pk, instance.worker, status, previous)], using=using)
+
+
+def _sync_booked_worker(worker_id, using):
+    """Book or release the worker of a booking that changed status or was deleted"""
+    changed = sync_worker_status([worker_id], using=using)
+    if not changed:
+        return
+
+    def refresh():
+        invalidate_stats()
+        bump_model_version(Worker)
+
+    transaction.on_commit(refresh, using=using)
+    publish_on_commit(
+        lambda: [worker_event(worker, changed[worker.pk]) for worker in Worker.objects.filter(pk__in=changed)],
+        using=using,
+    )
+
+
+@receiver(post_save, sender=BookingRequest)
+def sync_worker_status_on_save(sender, instance, created, using, raw=False, **kwargs):
+    # BookingRequestCreateSerializer reserves the worker itself while it holds the row lock
+    changed, _ = _status_change(instance, created)
+    if raw or created or not changed:
+        return
+    _sync_booked_worker(instance.worker_id, using)
+
+
+@receiver(post_delete, sender=BookingRequest)
+def sync_worker_status_on_delete(sender, instance, using, origin=None, **kwargs):
+    if _deleted_with_worker(origin):
+        # The worker is deleted along with its bookings
+        return
+    _sync_booked_worker(instance.worker_id, using)
+
+
+@receiver(post_save, sender=Worker)
+def generate_image_variants_on_upload(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or variants_are_current(instance):
+        return
+    transaction.on_commit(lambda: generate_variants(instance))
+
+
+@receiver(post_delete, sender=Worker)
+def delete_image_variants(sender, instance, using, **kwargs):
+    if not instance.image_variants:
+        return
+    storage, variants = instance.image.storage, instance.image_variants
+    transaction.on_commit(lambda: delete_variants(storage, variants), using=using)
+
+
+@receiver(post_save, sender=Worker)
+def sync_tags_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    changed = [
+        field for field in TAG_FIELDS
+        if created or previous is None or previous[field] != getattr(instance, field)
+    ]
+    if changed:
+        sync_worker_tags([instance], fields=changed)
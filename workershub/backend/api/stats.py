@@ -0,0 +1,102 @@
+"""
+Dashboard statistics for workers and booking requests.
+
+Each model is counted with a single grouped aggregate query and the grouped
+counts are kept in the cache, so the dashboard endpoints cost at most one
+query per model regardless of how many choices exist. Signal handlers in
+``api.signals`` drop the cached counts once a write that moves a row between
+groups commits, and the next read recounts. Every process must share the
+cache backend for that to reach them all; with the default per-process
+``LocMemCache`` other processes serve counts up to ``STATS_CACHE_TIMEOUT`` old.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Worker, BookingRequest
+
+
+WORKER_STATS_CACHE_KEY = 'api:stats:workers'
+BOOKING_STATS_CACHE_KEY = 'api:stats:bookings'
+
+# Fields a worker's counts are grouped by, in key order
+WORKER_STATS_FIELDS = ('status', 'profession', 'nationality')
+BOOKING_STATS_FIELDS = ('status',)
+
+
+def _grouped_rows(model, fields):
+    return (
+        model.objects.order_by()
+        .values_list(*fields)
+        .annotate(count=Count('id'))
+    )
+
+
+def _cached_counts(key, model, fields):
+    counts = cache.get(key)
+    if counts is None:
+        counts = {tuple(row[:-1]): row[-1] for row in _grouped_rows(model, fields)}
+        cache.set(key, counts, settings.STATS_CACHE_TIMEOUT)
+    return counts
+
+
+async def _acached_counts(key, model, fields):
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = {tuple(row[:-1]): row[-1] async for row in _grouped_rows(model, fields)}
+        await cache.aset(key, counts, settings.STATS_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_stats():
+    """Drop cached counts, e.g. after a bulk ``update()`` that bypasses signals"""
+    cache.delete_many([WORKER_STATS_CACHE_KEY, BOOKING_STATS_CACHE_KEY])
+
+
+def get_worker_stats():
+    return _worker_stats(_cached_counts(WORKER_STATS_CACHE_KEY, Worker, WORKER_STATS_FIELDS))
+
+
+async def aget_worker_stats():
+    return _worker_stats(await _acached_counts(WORKER_STATS_CACHE_KEY, Worker, WORKER_STATS_FIELDS))
+
+
+def get_booking_stats():
+    return _booking_stats(_cached_counts(BOOKING_STATS_CACHE_KEY, BookingRequest, BOOKING_STATS_FIELDS))
+
+
+async def aget_booking_stats():
+    return _booking_stats(await _acached_counts(BOOKING_STATS_CACHE_KEY, BookingRequest, BOOKING_STATS_FIELDS))
+
+
+def _worker_stats(counts):
+    status_stats = {value: 0 for value, _ in Worker.STATUS_CHOICES}
+    profession_stats = {value: 0 for value, _ in Worker.PROFESSION_CHOICES}
+    nationality_stats = {value: 0 for value, _ in Worker.NATIONALITY_CHOICES}
+    for (status, profession, nationality), count in counts.items():
+        if status in status_stats:
+            status_stats[status] += count
+        if profession in profession_stats:
+            profession_stats[profession] += count
+        if nationality in nationality_stats:
+            nationality_stats[nationality] += count
+
+    return {
+        'total_workers': sum(counts.values()),
+        'available_workers': status_stats['Available'],
+        'booked_workers': status_stats['Booked'],
+        'on_leave_workers': status_stats['On Leave'],
+        'profession_stats': profession_stats,
+        'nationality_stats': nationality_stats,
+    }
+
+
+def _booking_stats(counts):
+    status_stats = {value: counts.get((value,), 0) for value, _ in BookingRequest.STATUS_CHOICES}
+
+    return {
+        'total_requests': sum(counts.values()),
+        'pending_requests': status_stats['Pending'],
+        'approved_requests': status_stats['Approved'],
+        'rejected_requests': status_stats['Rejected'],
+    }
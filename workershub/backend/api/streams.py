@@ -0,0 +1,96 @@
+"""
+Server-Sent Events stream of worker and booking status changes.
+
+``GET /api/events/`` keeps the connection open and writes one event per
+status change published through ``api.events``, so clients can stop
+re-polling the worker list to notice that a worker was booked. Subscribers
+narrow the stream with comma-separated ``types`` (``worker``, ``booking``),
+``profession`` and ``nationality``. Streams are served under ASGI only, as a
+WSGI worker would be held for the whole connection.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .events import BOOKING_STATUS, WORKER_STATUS, get_broker
+from .models import Worker
+
+
+EVENT_TYPES = {'worker': WORKER_STATUS, 'booking': BOOKING_STATUS}
+
+FILTER_CHOICES = {
+    'profession': Worker.PROFESSION_CHOICES,
+    'nationality': Worker.NATIONALITY_CHOICES,
+}
+
+
+def parse_filters(params):
+    """Subscription filters from the query string, plus a dict of errors"""
+    filters, errors = {}, {}
+    types = params.get('types')
+    if types:
+        names = [name.strip() for name in types.split(',') if name.strip()]
+        unknown = [name for name in names if name not in EVENT_TYPES]
+        if unknown:
+            errors['types'] = [f'Unknown event types: {", ".join(unknown)}']
+        filters['type'] = {EVENT_TYPES[name] for name in names if name in EVENT_TYPES}
+    for field, choices in FILTER_CHOICES.items():
+        raw = params.get(field)
+        if not raw:
+            continue
+        values = {value.strip() for value in raw.split(',') if value.strip()}
+        unknown = values - {value for value, _ in choices}
+        if unknown:
+            errors[field] = [f'Unknown values: {", ".join(sorted(unknown))}']
+        filters[field] = values
+    return filters, errors
+
+
+def format_event(event):
+    data = json.dumps(event, separators=(',', ':'))
+    return f'id: {event["id"]}\nevent: {event["type"]}\ndata: {data}\n\n'
+
+
+async def event_lines(subscription):
+    try:
+        yield f'retry: {settings.EVENT_STREAM_RETRY_MS}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                # Dropped for falling behind: the client reloads, e.g. from the change feed
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            yield format_event(event)
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def event_stream(request):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event streams are only served under ASGI.'}, status=501)
+    filters, errors = parse_filters(request.GET)
+    if errors:
+        return JsonResponse(errors, status=400)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    subscription = get_broker().subscribe(filters, last_event_id=last_event_id)
+    response = StreamingHttpResponse(event_lines(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    # The ASGI handler closes the response when the client disconnects
+    response._resource_closers.append(subscription.close)
+    return response
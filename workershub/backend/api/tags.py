@@ -0,0 +1,108 @@
+"""
+Language and skill tags parsed from ``Worker.languages_spoken`` and
+``Worker.skills``.
+
+The text fields stay the source of truth and keep the API output unchanged;
+the tag tables mirror them so "speaks Arabic" is an exact, indexed join
+instead of a substring scan. Stored tags and filter values are normalized
+by the same ``tag_name``/``tag_key`` helpers so they always compare equal.
+"""
+import re
+import unicodedata
+
+from django.apps import apps
+
+
+# Text field on Worker -> many-to-many relation it is parsed into
+TAG_FIELDS = {
+    'languages_spoken': 'language_tags',
+    'skills': 'skill_tags',
+}
+
+TAG_SEPARATORS = re.compile(r'[,;\n]')
+
+
+def tag_name(text):
+    """Display name of one entry: inner whitespace collapsed, cut to the column length"""
+    return ' '.join(text.split())[:100]
+
+
+def tag_key(text):
+    """Case-insensitive key a tag is stored and looked up under"""
+    return tag_name(text).lower()
+
+
+def collation_key(key):
+    """``key`` folded the way accent- and case-insensitive collations compare it.
+
+    MySQL's default ``utf8mb4_0900_ai_ci`` treats "Español" and "Espanol" as
+    the same unique key, so the row a lookup returns may be spelled
+    differently from the key that was asked for.
+    """
+    decomposed = unicodedata.normalize('NFKD', key)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def split_tags(text):
+    """Map of lowercased key -> display name for each entry of a comma-separated field"""
+    tags = {}
+    for part in TAG_SEPARATORS.split(text or ''):
+        name = tag_name(part)
+        if name:
+            tags.setdefault(name.lower(), name)
+    return tags
+
+
+def sync_worker_tags(workers, fields=None):
+    """Replace the tag links of ``workers`` with what their text fields contain"""
+    worker_model = apps.get_model('api', 'Worker')
+    workers = [worker for worker in workers if worker.pk is not None]
+    if not workers:
+        return
+
+    for source_field, relation in TAG_FIELDS.items():
+        if fields is not None and source_field not in fields:
+            continue
+        m2m = worker_model._meta.get_field(relation)
+        tag_model = m2m.related_model
+        through = m2m.remote_field.through
+        worker_column = f'{m2m.m2m_field_name()}_id'
+        tag_column = f'{m2m.m2m_reverse_field_name()}_id'
+
+        parsed = {worker.pk: split_tags(getattr(worker, source_field)) for worker in workers}
+        names = {}
+        for tags in parsed.values():
+            names.update(tags)
+
+        tag_ids = {}
+        if names:
+            tag_model.objects.bulk_create(
+                [tag_model(key=key, name=name) for key, name in names.items()], ignore_conflicts=True
+            )
+            tag_ids = {
+                collation_key(key): tag_id
+                for key, tag_id in tag_model.objects.filter(key__in=names).values_list('key', 'id')
+            }
+
+        through.objects.filter(**{f'{worker_column}__in': list(parsed)}).delete()
+        through.objects.bulk_create([
+            through(**{worker_column: worker_id, tag_column: tag_ids[collation_key(key)]})
+            for worker_id, tags in parsed.items()
+            for key in tags
+        ], ignore_conflicts=True)
+
+
+def filter_by_tags(queryset, relation, values, match_all=False):
+    """Workers linked to any (or, with ``match_all``, every) tag named in ``values``"""
+    keys = {tag_key(value) for value in values} - {''}
+    if not keys:
+        return queryset
+
+    m2m = queryset.model._meta.get_field(relation)
+    links = m2m.remote_field.through.objects.values(f'{m2m.m2m_field_name()}_id')
+    key_lookup = f'{m2m.m2m_reverse_field_name()}__key'
+    if match_all:
+        for key in keys:
+            queryset = queryset.filter(id__in=links.filter(**{key_lookup: key}))
+        return queryset
+    return queryset.filter(id__in=links.filter(**{f'{key_lookup}__in': keys}))
@@ -1,3 +1,1391 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import re
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from PIL import Image
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from . import async_views, matching, streams, views
+from .caching import get_model_version
+from .events import BOOKING_STATUS, WORKER_STATUS, InProcessBroker, get_broker
+from .images import VARIANT_SIZES, variant_names, variants_are_current
+from .metrics import registry
+from .middleware import PrimaryStickinessMiddleware
+from .models import Worker, BookingRequest, BookingRollup, Language, Tombstone
+from .renderers import FastJSONRenderer
+from .rollups import rebuild_rollups
+from .tags import sync_worker_tags
+from .routers import ReplicaRouter, request_routing
+from .views import WorkerListView, BookingRequestListView
+
+
+class QueryPlanTests(TestCase):
+    """Run EXPLAIN on the SQL the list views generate and reject full scans"""
+
+    # (query params, whether the ORDER BY must be served by an index)
+    WORKER_QUERY_SHAPES = [
+        ({}, True),
+        ({'status': 'Available'}, True),
+        ({'profession': 'Cook'}, True),
+        ({'nationality': 'Filipino'}, True),
+        ({'religion': 'Islam'}, True),
+        ({'marital_status': 'Single'}, True),
+        ({'status': 'Available', 'profession': 'Cook'}, True),
+        ({'status': 'Available', 'nationality': 'Filipino'}, True),
+        ({'profession': 'Cook', 'nationality': 'Indian'}, True),
+        ({'age_min': '25', 'age_max': '30'}, False),
+        ({'experience_min': '5'}, False),
+        ({'experience_min': '2', 'experience_max': '8'}, False),
+        ({'salary_min': '1000', 'salary_max': '1500'}, False),
+        ({'ordering': 'age'}, True),
+        ({'ordering': '-experience_years'}, True),
+        ({'search': 'cook'}, False),
+        ({'search': 'eng', 'status': 'Available'}, False),
+        ({'languages': 'Arabic,English'}, False),
+        ({'languages': 'Arabic,English', 'languages_match': 'all', 'skills': 'Cooking'}, False),
+    ]
+
+    BOOKING_QUERY_SHAPES = [
+        ({}, True),
+        ({'status': 'Pending'}, True),
+        ({'ordering': '-updated_at'}, True),
+    ]
+
+    factory = APIRequestFactory()
+
+    def page_sql(self, view_class, params):
+        view = view_class()
+        view.request = view.initialize_request(self.factory.get('/', params))
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())[:20]
+        return queryset.query.sql_with_params()
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            if connection.vendor == 'mysql':
+                cursor.execute(f'EXPLAIN {sql}', params)
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        self.skipTest(f'No plan checks for {connection.vendor}')
+
+    def assert_plan(self, plan, table, indexed_order, shape):
+        if connection.vendor == 'sqlite':
+            full_scans = [step for step in plan if re.fullmatch(rf'SCAN {table}', step)]
+            sorts = [step for step in plan if 'USE TEMP B-TREE' in step]
+        else:
+            full_scans = [step for step in plan if step['table'] == table and step['type'] == 'ALL']
+            sorts = [step for step in plan if 'Using filesort' in (step['Extra'] or '')]
+        self.assertFalse(full_scans, f'{shape} does a full scan of {table}: {plan}')
+        if indexed_order:
+            self.assertFalse(sorts, f'{shape} sorts outside an index: {plan}')
+
+    def test_worker_list_query_shapes_use_indexes(self):
+        table = Worker._meta.db_table
+        for params, indexed_order in self.WORKER_QUERY_SHAPES:
+            with self.subTest(params=params):
+                plan = self.explain(*self.page_sql(WorkerListView, params))
+                self.assert_plan(plan, table, indexed_order, params)
+
+    def test_booking_list_query_shapes_use_indexes(self):
+        table = BookingRequest._meta.db_table
+        for params, indexed_order in self.BOOKING_QUERY_SHAPES:
+            with self.subTest(params=params):
+                plan = self.explain(*self.page_sql(BookingRequestListView, params))
+                self.assert_plan(plan, table, indexed_order, params)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class BookingQueryCountTests(TestCase):
+    """Booking reads load their worker in the same query regardless of page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(25):
+            worker = Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'QC{i:05d}', nationality='Kenyan',
+                profession='Cook', age=30
+            )
+            BookingRequest.objects.create(worker=worker, full_name=f'Client {i}', phone_number='+966501234567')
+
+    def test_booking_list_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/', {'worker__profession': 'Cook'})
+        self.assertEqual(len(response.json()['results']), 20)
+        self.assertEqual(response.json()['results'][0]['worker_profession'], 'Cook')
+
+    def test_booking_detail_query_count(self):
+        booking = BookingRequest.objects.first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/bookings/{booking.pk}/')
+        self.assertEqual(response.json()['worker_name'], booking.worker.name)
+
+    def test_sparse_fieldset_prunes_payload_and_columns(self):
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get('/api/bookings/', {'fields': 'id,status,worker_name'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'status', 'worker_name'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"api_worker"."name"', sql)
+        self.assertNotIn('phone_number', sql)
+        self.assertNotIn('"api_worker"."passport_number"', sql)
+
+        response = self.client.get('/api/bookings/', {'fields': 'id,missing'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class WorkerHistogramTests(TestCase):
+    """Range filters narrow the workers and the histograms count them in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(10):
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'HG{i:05d}', nationality='Indian',
+                profession='Nanny', age=20 + i * 3, experience_years=i,
+                salary_expectation=900 + i * 100 if i % 5 else None,
+            )
+
+    def test_range_filters(self):
+        response = self.client.get('/api/workers/', {'salary_min': '1000', 'salary_max': '1400', 'experience_max': '3'})
+        self.assertEqual(sorted(w['experience_years'] for w in response.json()['results']), [1, 2, 3])
+
+        response = self.client.get('/api/workers/', {'age_min': 'old'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('age_min', response.json())
+
+    def test_histograms_follow_filters(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/workers/histograms/', {'age_min': '26'})
+        data = response.json()
+        self.assertEqual(data['count'], 8)
+
+        age = data['histograms']['age']
+        self.assertEqual((age['min'], age['max']), (26, 47))
+        self.assertEqual(sum(bucket['count'] for bucket in age['buckets']), 8)
+        self.assertEqual(age['buckets'][0], {'low': None, 'high': 18, 'count': 0})
+        self.assertEqual(next(b for b in age['buckets'] if b['low'] == 26)['count'], 1)
+
+        salary = data['histograms']['salary_expectation']
+        self.assertEqual(sum(bucket['count'] for bucket in salary['buckets']), 7)
+        self.assertEqual(next(b for b in salary['buckets'] if b['low'] == 1000)['count'], 2)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class WorkerFacetTests(TestCase):
+    """Facets count the workers matching the current filters and search in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            ('Cook', 'Kenyan', 24, 900, 'Available'),
+            ('Cook', 'Indian', 31, 1200, 'Available'),
+            ('Cook', 'Indian', 45, None, 'On Leave'),
+            ('Driver', 'Indian', 33, 1800, 'Available'),
+            ('Nanny', 'Filipino', 28, 2500, 'Available'),
+        ]
+        for i, (profession, nationality, age, salary, status) in enumerate(rows):
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'FC{i:05d}', nationality=nationality, profession=profession,
+                age=age, salary_expectation=salary, status=status, skills='Cooking' if profession == 'Cook' else '',
+            )
+
+    def facets(self, **params):
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/workers/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_follow_the_filters(self):
+        data = self.facets(profession='Cook')
+        facets = data['facets']
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(facets['profession'], {**dict.fromkeys(facets['profession'], 0), 'Cook': 3})
+        self.assertEqual((facets['nationality']['Indian'], facets['nationality']['Kenyan']), (2, 1))
+        self.assertEqual(facets['nationality']['Filipino'], 0)
+        self.assertEqual((facets['status']['Available'], facets['status']['On Leave']), (2, 1))
+        self.assertEqual(facets['age'], {'<25': 1, '25-29': 0, '30-34': 1, '35-39': 0, '40-49': 1, '50+': 0})
+        self.assertEqual(sum(facets['salary_expectation'].values()), 2)
+
+        data = self.facets(nationality='Indian', status='Available')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual((data['facets']['profession']['Cook'], data['facets']['profession']['Driver']), (1, 1))
+
+    def test_search_is_counted_in_the_same_query(self):
+        data = self.facets(search='cook', nationality='Indian')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['facets']['status'], {**dict.fromkeys(data['facets']['status'], 0), 'Available': 1, 'On Leave': 1})
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise', CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    """The feed pages through saves and deletes after a cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.workers = [
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'CF{i:05d}', nationality='Kenyan', profession='Cook', age=30
+            )
+            for i in range(3)
+        ]
+        BookingRequest.objects.create(worker=cls.workers[2], full_name='Client', phone_number='+966501234567')
+
+    def test_pages_then_reports_changes_and_deletes(self):
+        with self.assertNumQueries(2):
+            first = self.client.get('/api/workers/changes/', {'limit': 2}).json()
+        self.assertEqual([w['id'] for w in first['changed']], [w.pk for w in self.workers[:2]])
+        self.assertTrue(first['has_more'])
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual([w['id'] for w in second['changed']], [self.workers[2].pk])
+        self.assertFalse(second['has_more'])
+
+        self.workers[0].status = 'On Leave'
+        self.workers[0].save()
+        deleted_pk = self.workers[2].pk
+        self.workers[2].delete()
+        third = self.client.get('/api/workers/changes/', {'since': second['cursor']}).json()
+        self.assertEqual([(w['id'], w['status']) for w in third['changed']], [(self.workers[0].pk, 'On Leave')])
+        self.assertEqual(third['deleted'], [deleted_pk])
+
+        bookings = self.client.get('/api/bookings/changes/').json()
+        self.assertEqual((bookings['changed'], len(bookings['deleted'])), ([], 1))
+        self.assertEqual(self.client.get('/api/workers/changes/', {'since': third['cursor']}).json()['changed'], [])
+
+    def test_final_cursor_is_rewound_by_the_settle_window(self):
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=60):
+            cursor = self.client.get('/api/workers/changes/').json()['cursor']
+            again = self.client.get('/api/workers/changes/', {'since': cursor}).json()
+        self.assertEqual(len(again['changed']), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/workers/changes/', {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json())
+
+
+class StatsCacheTests(TestCase):
+    """Cached dashboard counts match the tables after every committed write"""
+
+    def setUp(self):
+        cache.clear()
+        self.worker = Worker.objects.create(
+            name='Counted', passport_number='SC00001', nationality='Indian', profession='Cook', age=30
+        )
+
+    def stats(self):
+        return self.client.get('/api/stats/workers/').json(), self.client.get('/api/stats/bookings/').json()
+
+    def assertStatsExact(self):
+        workers, bookings = self.stats()
+        cached = (workers, bookings)
+        cache.clear()
+        self.assertEqual(cached, self.stats())
+        return workers, bookings
+
+    def test_writes_invalidate_cached_counts(self):
+        self.stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Worker.objects.create(name='New', passport_number='SC00002', nationality='Kenyan', profession='Driver', age=40)
+        workers, _ = self.assertStatsExact()
+        self.assertEqual((workers['total_workers'], workers['profession_stats']['Driver']), (2, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.status = 'On Leave'
+            self.worker.save()
+        workers, _ = self.assertStatsExact()
+        self.assertEqual((workers['available_workers'], workers['on_leave_workers']), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = BookingRequest.objects.create(worker=self.worker, full_name='Client', phone_number='+966501234567')
+        _, bookings = self.assertStatsExact()
+        self.assertEqual(bookings['pending_requests'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'Approved'
+            booking.save()
+        _, bookings = self.assertStatsExact()
+        self.assertEqual((bookings['pending_requests'], bookings['approved_requests']), (0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.delete()
+        workers, bookings = self.assertStatsExact()
+        self.assertEqual((workers['total_workers'], bookings['total_requests']), (1, 0))
+
+    def test_saves_that_keep_the_group_keep_the_cache(self):
+        self.stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.name = 'Renamed'
+            self.worker.save()
+        with self.assertNumQueries(0):
+            self.stats()
+
+    def test_saves_of_untracked_columns_skip_the_previous_state_query(self):
+        with self.assertNumQueries(1):
+            self.worker.image_variants = {}
+            self.worker.save(update_fields=['image_variants'])
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class BookingLifecycleTests(TestCase):
+    """A booking holds its worker until it is rejected or deleted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = Worker.objects.create(
+            name='Held Worker', passport_number='BL00001', nationality='Kenyan', profession='Cook', age=30
+        )
+
+    def create_booking(self):
+        return self.client.post('/api/bookings/create/', {
+            'worker': self.worker.pk, 'full_name': 'Client', 'phone_number': '+966501234567',
+        })
+
+    def worker_status(self):
+        return Worker.objects.get(pk=self.worker.pk).status
+
+    def test_rejecting_releases_the_worker(self):
+        response = self.create_booking()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.worker_status(), 'Booked')
+        self.assertEqual(self.create_booking().status_code, 400)
+
+        booking = BookingRequest.objects.get(worker=self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/bookings/{booking.pk}/', {'status': 'Rejected'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.worker_status(), 'Available')
+        self.assertEqual(self.client.get('/api/stats/workers/').json()['available_workers'], 1)
+        self.assertEqual(self.create_booking().status_code, 201)
+        self.assertEqual(self.worker_status(), 'Booked')
+
+    def test_deleting_releases_the_worker(self):
+        self.create_booking()
+        BookingRequest.objects.get(worker=self.worker).delete()
+        self.assertEqual(self.worker_status(), 'Available')
+
+    def test_updates_keep_the_booked_worker(self):
+        self.assertEqual(self.create_booking().status_code, 201)
+        booking = BookingRequest.objects.get(worker=self.worker)
+        url = f'/api/bookings/{booking.pk}/'
+        payload = {'worker': self.worker.pk, 'full_name': 'Renamed', 'phone_number': '+966501234567', 'status': 'Approved'}
+        response = self.client.put(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.patch(url, {'worker': self.worker.pk, 'notes': 'Call first'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.worker_status(), 'Booked')
+
+        other = Worker.objects.create(
+            name='Other', passport_number='BL00002', nationality='Kenyan', profession='Cook', age=30, status='Booked'
+        )
+        response = self.client.patch(url, {'worker': other.pk}, content_type='application/json')
+        self.assertEqual(response.json(), {'worker': ['This worker is not available for booking.']})
+
+    def test_worker_stays_booked_while_another_booking_holds_it(self):
+        approved = BookingRequest.objects.create(
+            worker=self.worker, full_name='First', phone_number='+966501234567', status='Approved'
+        )
+        pending = BookingRequest.objects.create(worker=self.worker, full_name='Second', phone_number='+966501234567')
+        Worker.objects.filter(pk=self.worker.pk).update(status='Booked')
+        pending.status = 'Rejected'
+        pending.save()
+        self.assertEqual(self.worker_status(), 'Booked')
+        approved.delete()
+        self.assertEqual(self.worker_status(), 'Available')
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class BookingStatusTransitionTests(TestCase):
+    """Bulk approval books the worker once and rejects the competing requests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.workers = [
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'BT{i:05d}', nationality='Kenyan',
+                profession='Cook', age=30
+            )
+            for i in range(3)
+        ]
+        cls.bookings = [
+            BookingRequest.objects.create(worker=worker, full_name=f'Client {i}', phone_number='+966501234567')
+            for worker in cls.workers for i in range(3)
+        ]
+
+    def test_bulk_approve(self):
+        first, second, third = self.bookings[:3]
+        other = self.bookings[3]
+        response = self.client.post(
+            '/api/bookings/status/',
+            {'ids': [second.pk, first.pk, other.pk, 999999], 'status': 'Approved'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        results = {row['id']: (row['result'], row['status']) for row in response.json()['results']}
+        self.assertEqual(results, {
+            first.pk: ('updated', 'Approved'),
+            second.pk: ('conflict', 'Rejected'),
+            other.pk: ('updated', 'Approved'),
+            999999: ('not_found', None),
+        })
+        self.assertEqual(
+            response.json()['rejected_competing'],
+            [second.pk, third.pk, self.bookings[4].pk, self.bookings[5].pk],
+        )
+        self.assertEqual(
+            dict(BookingRequest.objects.filter(worker=self.workers[0]).values_list('pk', 'status')),
+            {first.pk: 'Approved', second.pk: 'Rejected', third.pk: 'Rejected'},
+        )
+        self.assertEqual(
+            list(Worker.objects.order_by('pk').values_list('status', flat=True)),
+            ['Booked', 'Booked', 'Available'],
+        )
+
+    def transition(self, ids, status):
+        response = self.client.post('/api/bookings/status/', {'ids': ids, 'status': status}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bulk_reject_releases_the_worker_with_its_last_booking(self):
+        Worker.objects.filter(pk=self.workers[2].pk).update(status='Booked')
+        ids = [booking.pk for booking in self.bookings[6:]]
+        data = self.transition(ids[:2], 'Rejected')
+        self.assertEqual([row['result'] for row in data['results']], ['updated'] * 2)
+        self.assertEqual(Worker.objects.get(pk=self.workers[2].pk).status, 'Booked')
+
+        data = self.transition(ids, 'Rejected')
+        self.assertEqual([row['result'] for row in data['results']], ['unchanged', 'unchanged', 'updated'])
+        self.assertEqual(data['rejected_competing'], [])
+        self.assertEqual(BookingRequest.objects.filter(status='Rejected').count(), 3)
+        self.assertEqual(Worker.objects.get(pk=self.workers[2].pk).status, 'Available')
+
+    def test_rejecting_an_approved_booking_releases_the_worker(self):
+        first = self.bookings[0]
+        self.transition([first.pk], 'Approved')
+        self.assertEqual(Worker.objects.get(pk=self.workers[0].pk).status, 'Booked')
+
+        data = self.transition([first.pk], 'Rejected')
+        self.assertEqual(data['results'], [{'id': first.pk, 'status': 'Rejected', 'result': 'updated'}])
+        self.assertEqual(Worker.objects.get(pk=self.workers[0].pk).status, 'Available')
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class BookingRollupTests(TestCase):
+    """Booking writes keep the daily rollups equal to a rebuild, and the series reads only them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook = Worker.objects.create(name='Cook', passport_number='RU00001', nationality='Kenyan', profession='Cook', age=30)
+        cls.nanny = Worker.objects.create(name='Nanny', passport_number='RU00002', nationality='Indian', profession='Nanny', age=30)
+
+    def rollup_rows(self):
+        return {
+            (row.day, row.status, row.profession, row.nationality): (row.count, round(row.approval_seconds, 3))
+            for row in BookingRollup.objects.exclude(count=0)
+        }
+
+    def test_writes_match_a_rebuild(self):
+        create = {'full_name': 'Client', 'phone_number': '+966501234567'}
+        for worker in (self.cook, self.nanny):
+            response = self.client.post('/api/bookings/create/', {**create, 'worker': worker.pk}, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+        extra = [BookingRequest.objects.create(worker=self.cook, full_name=f'Client {i}', phone_number='+966501234567') for i in range(3)]
+
+        cook_booking = BookingRequest.objects.filter(worker=self.cook).order_by('pk').first()
+        response = self.client.patch(f'/api/bookings/{cook_booking.pk}/', {'status': 'Approved'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.client.post('/api/bookings/status/', {'ids': [extra[0].pk], 'status': 'Rejected'}, content_type='application/json')
+        extra[1].delete()
+
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+        today = cook_booking.created_at.date()
+        self.assertEqual(incremental[(today, 'Pending', 'Cook', 'Kenyan')][0], 1)
+        self.assertEqual(incremental[(today, 'Rejected', 'Cook', 'Kenyan')][0], 1)
+        self.assertEqual(incremental[(today, 'Approved', 'Cook', 'Kenyan')][0], 1)
+
+    def test_worker_delete_releases_its_bookings_at_once(self):
+        def delete_worker(bookings):
+            worker = Worker.objects.create(
+                name='Gone', passport_number=f'RU1{bookings:04d}', nationality='Kenyan', profession='Cook', age=30
+            )
+            for i in range(bookings):
+                BookingRequest.objects.create(worker=worker, full_name=f'Client {i}', phone_number='+966501234567')
+            with CaptureQueriesContext(connection) as queries:
+                worker.delete()
+            return len(queries)
+
+        BookingRequest.objects.create(worker=self.nanny, full_name='Client', phone_number='+966501234567')
+        self.assertEqual(delete_worker(1), delete_worker(5))
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertEqual(sum(count for count, _ in incremental.values()), 1)
+        self.assertEqual(Tombstone.objects.filter(model='api.bookingrequest').count(), 6)
+
+    def test_series_reads_only_the_rollups(self):
+        for worker in (self.cook, self.cook, self.nanny):
+            BookingRequest.objects.create(worker=worker, full_name='Client', phone_number='+966501234567')
+        booking = BookingRequest.objects.filter(worker=self.nanny).get()
+        booking.status = 'Approved'
+        booking.save()
+
+        today = booking.created_at.date()
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get('/api/stats/bookings/series/', {'group_by': 'profession', 'granularity': 'week', 'end': today})
+        self.assertNotIn('api_bookingrequest', queries.captured_queries[0]['sql'])
+        point = response.json()['series'][-1]
+        self.assertEqual((point['total'], point['counts']['Cook'], point['counts']['Nanny'], point['approved']), (3, 2, 1, 1))
+        self.assertGreaterEqual(point['avg_approval_seconds'], 0)
+        self.assertEqual(response.json()['series'][0]['total'], 0)
+
+        response = self.client.get('/api/stats/bookings/series/', {'start': today, 'end': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise', CHANGE_FEED_SETTLE_SECONDS=0)
+class WorkerMatchTests(TestCase):
+    """Available workers are ranked from the in-memory index, which follows worker changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def worker(name, **fields):
+            fields = {'nationality': 'Filipino', 'profession': 'Nanny', 'age': 30, **fields}
+            return Worker.objects.create(name=name, passport_number=f'WM{name[-1]}0000', **fields)
+
+        cls.best = worker('Nanny A', languages_spoken='English, Arabic', salary_expectation=1400, experience_years=6)
+        cls.pricey = worker('Nanny B', languages_spoken='English, Arabic', salary_expectation=2500, experience_years=6)
+        cls.monolingual = worker('Nanny C', languages_spoken='English', salary_expectation=1200, experience_years=6)
+        cls.booked = worker('Nanny D', languages_spoken='English, Arabic', salary_expectation=1000, status='Booked')
+        cls.driver = worker('Driver E', languages_spoken='English, Arabic', salary_expectation=1000, profession='Driver')
+
+    def setUp(self):
+        patcher = mock.patch.object(matching, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def match(self, **params):
+        params = {'profession': 'Nanny', 'languages': 'english,ARABIC', 'budget': 1500, 'min_experience': 5, **params}
+        response = self.client.get('/api/workers/match/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_candidates_are_ranked(self):
+        data = self.match()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([item['id'] for item in data['results']], [self.best.pk, self.monolingual.pk, self.pricey.pk])
+        self.assertEqual(data['results'][0]['match_score'], 1.0)
+        self.assertEqual(data['results'][0]['name'], 'Nanny A')
+        self.assertEqual(len(self.match(limit=1)['results']), 1)
+
+    def test_index_follows_worker_changes(self):
+        self.match()
+        self.pricey.salary_expectation = 1000
+        self.pricey.save()
+        self.best.delete()
+        Worker.objects.filter(pk=self.monolingual.pk).update(status='Booked', updated_at=timezone.now())
+        Worker.objects.create(
+            name='Nanny F', passport_number='WMF0000', nationality='Kenyan', profession='Nanny', age=40,
+            languages_spoken='Arabic', experience_years=1,
+        )
+
+        data = self.match()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([item['name'] for item in data['results']], ['Nanny B', 'Nanny F'])
+        self.assertEqual(data['results'][0]['match_score'], 1.0)
+
+    def test_invalid_requirements_are_rejected(self):
+        for params in [{'nationalities': 'Filipino,Martian'}, {'min_age': 40, 'max_age': 30}, {'limit': 0}]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/workers/match/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+class AdminChangelistTests(TestCase):
+    """Admin pages do not load every worker or count the tables twice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.workers = [
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'AD{i:05d}', nationality='Nepalese', profession='Driver', age=30
+            )
+            for i in range(5)
+        ]
+        cls.booking = BookingRequest.objects.create(worker=cls.workers[0], full_name='Client', phone_number='+966501234567')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changelist_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_booking_form_uses_autocomplete(self):
+        response = self.client.get(f'/admin/api/bookingrequest/{self.booking.pk}/change/')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, self.workers[4].name)
+
+    def test_changelists_count_once(self):
+        for path in ['/admin/api/worker/', '/admin/api/bookingrequest/?worker__profession__exact=Driver']:
+            with self.subTest(path=path):
+                counts = [sql for sql in self.changelist_queries(path) if 'COUNT(' in sql]
+                self.assertEqual(len(counts), 1)
+
+    def test_worker_search_matches_passport_exactly(self):
+        response = self.client.get('/admin/api/worker/', {'q': 'ad00003'})
+        self.assertContains(response, 'Worker 3')
+        self.assertNotContains(response, 'Worker 2')
+        sql = self.changelist_queries('/admin/api/worker/?q=AD00003')
+        self.assertFalse([query for query in sql if 'passport_number" LIKE' in query])
+
+
+class RequestMetricsTests(TestCase):
+    """Requests are recorded per URL name and exposed at /metrics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'MT{i:05d}', nationality='Kenyan', profession='Nanny', age=30
+            )
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def metric(self, text, name, **labels):
+        label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{name}{{{re.escape(label_text)}}} (\S+)$', text, re.MULTILINE)
+        return float(match.group(1)) if match else None
+
+    def test_requests_are_labelled_by_url_name(self):
+        for path in ['/api/workers/', '/api/workers/', f'/api/workers/{Worker.objects.first().pk}/', '/api/missing/']:
+            self.client.get(path)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+
+        labels = {'view': 'worker-list', 'method': 'GET', 'status': '200'}
+        self.assertEqual(self.metric(text, 'workershub_http_request_duration_seconds_count', **labels), 2)
+        self.assertGreater(self.metric(text, 'workershub_http_request_db_queries_sum', **labels), 0)
+        self.assertGreater(self.metric(text, 'workershub_http_request_serialization_seconds_sum', **labels), 0)
+        self.assertGreater(self.metric(text, 'workershub_http_response_size_bytes_sum', **labels), 0)
+        self.assertEqual(self.metric(
+            text, 'workershub_http_request_duration_seconds_bucket', **labels, le='+Inf'
+        ), 2)
+        self.assertIn('view="worker-detail",method="GET",status="200"', text)
+        self.assertIn('view="unresolved",method="GET",status="404"', text)
+        self.assertNotIn('view="metrics"', text)
+
+    @override_settings(SLOW_REQUEST_SECONDS=1e-9)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('api.metrics.slow', 'WARNING') as logs:
+            self.client.get('/api/workers/')
+        self.assertIn('GET /api/workers/ (worker-list)', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk the whole list once in both directions, whatever the ties and NULLs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(45):
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'KP{i:05d}', nationality='Indian', profession='Cook',
+                age=30 + i % 3, salary_expectation=None if i % 3 == 0 else 1000 + (i % 2) * 500,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def walk(self, ordering):
+        pages, data = [], self.get('/api/workers/', {'cursor': '', 'ordering': ordering})
+        while True:
+            pages.append([row['id'] for row in data['results']])
+            if not data['next']:
+                break
+            data = self.get(data['next'])
+
+        backwards = []
+        while data['previous']:
+            data = self.get(data['previous'])
+            backwards.insert(0, [row['id'] for row in data['results']])
+        return pages, backwards
+
+    def test_traversal_under_ties_and_nulls(self):
+        for ordering in ['age', '-age', 'salary_expectation', '-salary_expectation']:
+            with self.subTest(ordering=ordering):
+                expected = list(
+                    Worker.objects.order_by(ordering, '-created_at', '-id').values_list('id', flat=True)
+                )
+                pages, backwards = self.walk(ordering)
+                self.assertEqual([len(page) for page in pages], [20, 20, 5])
+                self.assertEqual(sum(pages, []), expected)
+                self.assertEqual(backwards, pages[:-1])
+
+    def test_garbage_cursors_are_not_found(self):
+        valid = self.get('/api/workers/', {'cursor': '', 'ordering': 'age'})['next']
+        cursor = valid.split('cursor=')[1].split('&')[0]
+        payload = json.loads(base64.urlsafe_b64decode(cursor))
+        tampered = [
+            {**payload, 'o': ['name', '-created_at', '-id']},
+            {**payload, 'v': payload['v'][:1]},
+            {**payload, 'v': ['not a number', 'yesterday', 'x']},
+        ]
+        cursors = ['!!!', 'bm90IGpzb24=', base64.urlsafe_b64encode(b'{"o": []}').decode()] + [
+            base64.urlsafe_b64encode(json.dumps(value).encode()).decode() for value in tampered
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/workers/', {'cursor': cursor, 'ordering': 'age'})
+                self.assertEqual(response.status_code, 404)
+
+    def test_counts(self):
+        self.assertNotIn('count', self.get('/api/workers/', {'cursor': ''}))
+        for mode in ['exact', 'estimated']:
+            with self.subTest(mode=mode):
+                data = self.get('/api/workers/', {'cursor': '', 'count': mode, 'age_min': 31, 'age_max': 31})
+                self.assertEqual(data['count'], 15)
+
+
+class WorkerSearchTests(TestCase):
+    """?search= matches every term as a prefix, ranks by relevance and follows worker writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook = Worker.objects.create(
+            name='Amina Yusuf', passport_number='WS00001', nationality='Kenyan', profession='Cook', age=30,
+            skills='Cooking, baking', languages_spoken='English, Swahili',
+        )
+        cls.chef = Worker.objects.create(
+            name='Grace Cook', passport_number='WS00002', nationality='Kenyan', profession='Cook', age=35,
+            skills='Cooking', languages_spoken='Swahili',
+        )
+        cls.driver = Worker.objects.create(
+            name='Ravi Kumar', passport_number='WS00003', nationality='Indian', profession='Driver', age=40,
+            languages_spoken='Hindi, English',
+        )
+
+    def search(self, terms, **params):
+        # Writes bump the response cache version on commit, which TestCase never reaches
+        cache.clear()
+        response = self.client.get('/api/workers/', {'search': terms, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_terms_match_as_prefixes(self):
+        self.assertEqual(set(self.search('swah')), {'Amina Yusuf', 'Grace Cook'})
+        self.assertEqual(self.search('engl kum'), ['Ravi Kumar'])
+        self.assertEqual(self.search('hindi baking'), [])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_matches_are_ranked(self):
+        self.assertEqual(self.search('cook'), ['Grace Cook', 'Amina Yusuf'])
+        self.assertEqual(self.search('cook', ordering='age'), ['Amina Yusuf', 'Grace Cook'])
+        page = self.client.get('/api/workers/', {'search': 'cook', 'cursor': ''}).json()
+        self.assertEqual([row['name'] for row in page['results']], ['Grace Cook', 'Amina Yusuf'])
+
+    def test_index_follows_worker_writes(self):
+        self.driver.skills = 'Gardening'
+        self.driver.save()
+        self.assertEqual(self.search('garden'), ['Ravi Kumar'])
+        self.driver.delete()
+        self.assertEqual(self.search('garden'), [])
+        self.assertEqual(self.search('english'), ['Amina Yusuf'])
+
+
+class TagFilterTests(TestCase):
+    """?languages= and ?skills= match any listed tag, or every one with *_match=all"""
+
+    @classmethod
+    def setUpTestData(cls):
+        common = {'nationality': 'Filipino', 'profession': 'Caregiver', 'age': 30}
+        Worker.objects.create(
+            name='Both', passport_number='TF00001', languages_spoken='Arabic, English',
+            skills='Elderly care; Cooking', **common,
+        )
+        Worker.objects.create(
+            name='Arabic only', passport_number='TF00002', languages_spoken='arabic', skills='Cooking', **common,
+        )
+        Worker.objects.create(
+            name='English only', passport_number='TF00003', languages_spoken='ENGLISH',
+            skills='elderly   care', **common,
+        )
+
+    def names(self, **params):
+        response = self.client.get('/api/workers/', params)
+        self.assertEqual(response.status_code, 200)
+        return {row['name'] for row in response.json()['results']}
+
+    def test_any_and_all(self):
+        self.assertEqual(self.names(languages='Arabic,English'), {'Both', 'Arabic only', 'English only'})
+        self.assertEqual(self.names(languages='Arabic,English', languages_match='all'), {'Both'})
+        self.assertEqual(self.names(languages='Arabic', skills='Cooking,Elderly care', skills_match='all'), {'Both'})
+        self.assertEqual(self.names(languages='French'), set())
+
+    def test_values_are_normalized_like_stored_tags(self):
+        self.assertEqual(self.names(skills='  ELDERLY  care '), {'Both', 'English only'})
+        self.assertEqual(self.names(languages='arabic, ,'), {'Both', 'Arabic only'})
+
+    def test_accent_insensitive_collations_reuse_the_stored_tag(self):
+        # Mimic MySQL's utf8mb4_0900_ai_ci, where "español" collides with the stored "espanol"
+        stored = Language.objects.create(key='espanol', name='Espanol')
+        worker = Worker.objects.get(name='Arabic only')
+        worker.languages_spoken = 'Español'
+        all_tags = Language.objects.all
+        with mock.patch.object(Language.objects, 'bulk_create'), \
+                mock.patch.object(Language.objects, 'filter', side_effect=lambda **lookups: all_tags()):
+            sync_worker_tags([worker], fields=['languages_spoken'])
+        self.assertEqual(list(worker.language_tags.all()), [stored])
+
+
+class ConditionalCacheTests(TestCase):
+    """Worker reads carry an ETag, answer 304 while it holds and move it once a write commits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = Worker.objects.create(
+            name='Cached Worker', passport_number='CC00001', nationality='Indian', profession='Cook', age=30
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_and_not_modified(self):
+        for path in ['/api/workers/', f'/api/workers/{self.worker.pk}/']:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertRegex(etag, r'^"[0-9a-f]{40}"$')
+                self.assertIn('Last-Modified', response)
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_committed_worker_write_moves_the_etag(self):
+        etag = self.client.get('/api/workers/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.name = 'Renamed Worker'
+            self.worker.save()
+        response = self.client.get('/api/workers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['name'], 'Renamed Worker')
+
+    def test_committed_booking_write_moves_the_versions(self):
+        booking_version = get_model_version(BookingRequest)
+        etag = self.client.get('/api/workers/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/bookings/create/', {
+                'worker': self.worker.pk, 'full_name': 'Client', 'phone_number': '+966501234567',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(get_model_version(BookingRequest), booking_version)
+
+        response = self.client.get('/api/workers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'Booked')
+
+    def test_uncommitted_write_keeps_the_etag(self):
+        etag = self.client.get('/api/workers/')['ETag']
+        with self.captureOnCommitCallbacks(execute=False):
+            self.worker.name = 'Rolled Back'
+            self.worker.save()
+        self.assertEqual(self.client.get('/api/workers/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class ImageVariantTests(TestCase):
+    """Variants are made once an upload commits, never on reads, and go away with their worker"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def upload(self, content=None, name='photo.png'):
+        if content is None:
+            output = io.BytesIO()
+            Image.new('RGB', (640, 400), 'teal').save(output, format='PNG')
+            content = output.getvalue()
+        return SimpleUploadedFile(name, content, content_type='image/png')
+
+    def create_worker(self, image):
+        return Worker.objects.create(
+            name='Pictured', passport_number='IV00001', nationality='Indian', profession='Cook', age=30, image=image,
+        )
+
+    def test_upload_generates_variants_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            worker = self.create_worker(self.upload())
+        worker.refresh_from_db()
+        self.assertEqual(worker.image_variants['source'], worker.image.name)
+        storage = worker.image.storage
+        for variant, (width, height) in VARIANT_SIZES.items():
+            with self.subTest(variant=variant):
+                name = worker.image_variants[variant]
+                with storage.open(name) as image_file:
+                    size = Image.open(image_file).size
+                self.assertLessEqual(size, (width, height))
+        card = self.client.get('/api/workers/').json()['results'][0]['image_url']
+        self.assertTrue(card.endswith(worker.image_variants['card']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.delete()
+        for name in variant_names(worker.image_variants):
+            self.assertFalse(storage.exists(name))
+
+    def test_reads_never_generate_variants(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            worker = self.create_worker(self.upload())
+        for path in ['/api/workers/', f'/api/workers/{worker.pk}/']:
+            with self.subTest(path=path):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(path)
+                self.assertEqual([query['sql'] for query in queries if not query['sql'].startswith('SELECT')], [])
+                self.assertIn(worker.image.name, json.dumps(response.json()))
+        worker.refresh_from_db()
+        self.assertEqual(worker.image_variants, {})
+
+    def test_unreadable_image_is_recorded_once(self):
+        with self.assertLogs('api.images', 'WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                worker = self.create_worker(self.upload(b'not an image'))
+        self.assertEqual(len(logs.output), 1)
+        worker.refresh_from_db()
+        self.assertEqual(worker.image_variants['source'], worker.image.name)
+        self.assertIn('error', worker.image_variants)
+        self.assertTrue(variants_are_current(worker))
+
+        with mock.patch('api.signals.generate_variants') as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                worker.name = 'Renamed'
+                worker.save()
+        generate.assert_not_called()
+        self.assertTrue(self.client.get(f'/api/workers/{worker.pk}/').json()['image_url'].endswith(worker.image.name))
+
+
+class ExportTests(TestCase):
+    """Exports apply the list filters and stream every matching row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(30):
+            worker = Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'EX{i:05d}', nationality='Nepalese',
+                profession='Driver' if i % 3 else 'Gardener', age=30
+            )
+            BookingRequest.objects.create(worker=worker, full_name=f'Client {i}', phone_number='+966501234567')
+
+    def test_worker_csv_export(self):
+        response = self.client.get('/api/workers/export/', {'profession': 'Driver'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 20)
+        self.assertEqual({row['profession'] for row in rows}, {'Driver'})
+        self.assertEqual([int(row['id']) for row in rows], sorted(int(row['id']) for row in rows))
+
+    def test_booking_jsonl_export(self):
+        response = self.client.get('/api/bookings/export/', {'format': 'jsonl', 'worker__profession': 'Gardener'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(all(row['worker_passport'].startswith('EX') for row in rows))
+
+    def test_invalid_filter_is_reported_as_json(self):
+        response = self.client.get('/api/workers/export/', {'status': 'Missing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
+
+
+class ImportCommandTests(TestCase):
+    """import_workers upserts on passport_number, import_bookings links by passport, both report rejects"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        cache.clear()
+
+    def write_file(self, name, text):
+        path = f'{self.directory}/{name}'
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        return path
+
+    def run_import(self, command, path, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(command, path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def import_workers(self):
+        path = self.write_file('workers.csv', (
+            'name,passport_number,nationality,profession,age,languages_spoken,skills\n'
+            'Amina Yusuf,IM00001,Kenyan,Cook,30,"English, Swahili",Baking\n'
+            'Ravi Kumar,IM00002,Indian,Driver,40,Hindi,Driving\n'
+            'Nowhere,IM00003,Martian,Driver,30,Hindi,\n'
+            'Amina Yusuf,IM00001,Kenyan,Cook,31,Arabic,Baking\n'
+        ))
+        return self.run_import('import_workers', path)
+
+    def test_workers_are_upserted_and_indexed(self):
+        Worker.objects.create(name='Old name', passport_number='IM00002', nationality='Indian', profession='Driver', age=50)
+        with CaptureQueriesContext(connection) as queries:
+            stdout, stderr = self.import_workers()
+        self.assertIn('4 rows read, 2 written, 1 rejected', stdout)
+        if connection.vendor == 'sqlite':
+            # The batch is indexed with one DELETE and one executemany INSERT
+            fts = [query['sql'] for query in queries.captured_queries if 'api_worker_fts' in query['sql']]
+            self.assertEqual(len(fts), 2, fts)
+        self.assertIn('1 rows rejected', stderr)
+        self.assertNotIn('Line 4', stderr)
+
+        self.assertEqual(Worker.objects.count(), 2)
+        amina = Worker.objects.get(passport_number='IM00001')
+        self.assertEqual((amina.age, amina.languages_spoken), (31, 'Arabic'))
+        self.assertEqual(Worker.objects.get(passport_number='IM00002').name, 'Ravi Kumar')
+        self.assertEqual([tag.key for tag in amina.language_tags.all()], ['arabic'])
+
+        names = {row['name'] for row in self.client.get('/api/workers/', {'languages': 'hindi'}).json()['results']}
+        self.assertEqual(names, {'Ravi Kumar'})
+        names = [row['name'] for row in self.client.get('/api/workers/', {'search': 'bak'}).json()['results']]
+        self.assertEqual(names, ['Amina Yusuf'])
+
+    def test_rejects_are_listed_on_request(self):
+        rejects = f'{self.directory}/rejects.jsonl'
+        path = self.write_file('workers.jsonl', '{"name": "No passport", "age": 30}\nnot json\n')
+        stdout, stderr = self.run_import('import_workers', path, '--rejects', rejects)
+        self.assertIn('2 rows read, 0 written, 2 rejected', stdout)
+        self.assertEqual(stderr, '')
+        with open(rejects, encoding='utf-8') as handle:
+            lines = [json.loads(line) for line in handle]
+        self.assertEqual([line['line'] for line in lines], [1, 2])
+        self.assertIn('passport_number', lines[0]['errors'])
+
+        _, stderr = self.run_import('import_workers', path, '--verbosity', '2')
+        self.assertIn('Line 2', stderr)
+
+    def test_bookings_link_workers_and_update_rollups(self):
+        self.import_workers()
+        path = self.write_file('bookings.csv', (
+            'full_name,phone_number,status,worker_passport\n'
+            'Client A,+966501234567,Pending,IM00001\n'
+            'Client B,+966501234567,Approved,IM00002\n'
+            'Client C,+966501234567,Pending,MISSING\n'
+        ))
+        stdout, _ = self.run_import('import_bookings', path)
+        self.assertIn('3 rows read, 2 written, 1 rejected', stdout)
+        self.assertEqual(
+            set(BookingRequest.objects.values_list('full_name', 'worker__passport_number')),
+            {('Client A', 'IM00001'), ('Client B', 'IM00002')},
+        )
+
+        incremental = {(row.status, row.profession): row.count for row in BookingRollup.objects.exclude(count=0)}
+        self.assertEqual(incremental, {('Pending', 'Cook'): 1, ('Approved', 'Driver'): 1})
+        rebuild_rollups()
+        self.assertEqual(
+            incremental, {(row.status, row.profession): row.count for row in BookingRollup.objects.exclude(count=0)}
+        )
+
+
+class FastListSerializationTests(TestCase):
+    """The values() fast path renders the same bytes as the serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            worker = Worker.objects.create(
+                name=f'Worker\u2028{i}', passport_number=f'FP{i:05d}', nationality='Filipino',
+                profession='Cook', age=30, salary_expectation='1250.5' if i % 2 else None,
+                image_variants={'source': 'workers/a.png', 'card': 'workers/a.card.1.jpg'} if i == 0 else {},
+                image='workers/a.png' if i == 0 else '',
+            )
+            BookingRequest.objects.create(worker=worker, full_name='Client ü', phone_number='+966501234567', email=None)
+
+    def test_fast_path_matches_serializer(self):
+        for path in ['/api/workers/', '/api/workers/?fields=name,image_url&cursor=', '/api/bookings/']:
+            with self.subTest(path=path):
+                cache.clear()
+                with override_settings(FAST_LIST_SERIALIZATION=False):
+                    expected = self.client.get(path).content
+                cache.clear()
+                self.assertEqual(self.client.get(path).content, expected)
+
+    def test_floats_render_like_json_renderer(self):
+        data = {'scores': [0.1, 1250.5, 1e16, 1.5e300, -2e-05, 1e-07, 123456789.125], 'note': 'tiny 0.0000'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({'score': 0.25}), b'{"score":0.25}')
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Reads use a replica until the request or client has written"""
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        router = ReplicaRouter(replicas=['replica1'])
+        with request_routing() as wrote:
+            self.assertEqual(router.db_for_read(Worker), 'replica1')
+            self.assertEqual(router.db_for_write(BookingRequest), 'default')
+            self.assertTrue(wrote())
+            self.assertEqual(router.db_for_read(Worker), 'default')
+        with request_routing():
+            self.assertEqual(router.db_for_read(Worker), 'replica1')
+        with request_routing(pinned=True):
+            self.assertEqual(router.db_for_read(BookingRequest), 'default')
+        self.assertIsNone(router.db_for_read(User))
+
+    @override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+    def test_write_response_pins_the_client(self):
+        def view(request):
+            ReplicaRouter(replicas=['replica1']).db_for_write(BookingRequest)
+            return HttpResponse()
+
+        # A clock whose pin would round up past now + REPLICA_STICKY_SECONDS
+        with mock.patch('api.middleware.time.time', return_value=1000.0006):
+            response = PrimaryStickinessMiddleware(view)(RequestFactory().post('/'))
+            until = response.cookies['primary_until'].value
+            middleware = PrimaryStickinessMiddleware(lambda request: HttpResponse())
+            self.assertTrue(middleware.is_pinned(RequestFactory().get('/', HTTP_COOKIE=f'primary_until={until}')))
+        self.assertFalse(middleware.is_pinned(RequestFactory().get('/', HTTP_COOKIE='primary_until=9999999999')))
+        self.assertFalse(middleware.is_pinned(RequestFactory().get('/')))
+
+
+class AsyncReadViewTests(TestCase):
+    """The async read views return the same bytes as their sync counterparts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(25):
+            Worker.objects.create(
+                name=f'Worker {i}', passport_number=f'AS{i:05d}', nationality='Indian',
+                profession='Cook' if i % 2 else 'Nanny', age=25 + i
+            )
+        cls.worker = Worker.objects.first()
+
+    async def test_async_views_match_sync_views(self):
+        cases = [
+            (views.WorkerListView, async_views.WorkerListView, '/api/workers/', {}),
+            (views.WorkerListView, async_views.WorkerListView, '/api/workers/?profession=Cook&page=2', {}),
+            (views.WorkerListView, async_views.WorkerListView, '/api/workers/?cursor=&count=exact', {}),
+            (views.WorkerListView, async_views.WorkerListView, '/api/workers/?page=9', {}),
+            (views.WorkerDetailView, async_views.WorkerDetailView, f'/api/workers/{self.worker.pk}/', {'pk': self.worker.pk}),
+            (views.WorkerDetailView, async_views.WorkerDetailView, '/api/workers/0/', {'pk': 0}),
+            (views.worker_stats, async_views.worker_stats, '/api/stats/workers/', {}),
+            (views.booking_stats, async_views.booking_stats, '/api/stats/bookings/', {}),
+        ]
+        for sync_view, async_view, path, kwargs in cases:
+            with self.subTest(path=path):
+                if isinstance(sync_view, type):
+                    sync_view, async_view = sync_view.as_view(), async_view.as_view()
+                await cache.aclear()
+                expected = await sync_to_async(lambda: sync_view(RequestFactory().get(path), **kwargs).render())()
+                await cache.aclear()
+                response = await async_view(AsyncRequestFactory().get(path), **kwargs)
+                response.render()
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+
+
+@override_settings(EVENT_STREAM_HEARTBEAT_SECONDS=0.05)
+class EventStreamTests(TestCase):
+    """Status changes reach the matching subscribers once they commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cook, cls.nanny = [
+            Worker.objects.create(
+                name=name, passport_number=f'EV{i:05d}', nationality='Kenyan', profession=name, age=30
+            )
+            for i, name in enumerate(['Cook', 'Nanny'])
+        ]
+        cls.bookings = [
+            BookingRequest.objects.create(worker=cls.cook, full_name=f'Client {i}', phone_number='+966501234567')
+            for i in range(2)
+        ]
+
+    async def next_event(self, lines):
+        while True:
+            line = (await asyncio.wait_for(anext(lines), 1)).decode()
+            if not line.startswith(':'):
+                return line
+
+    def book_both_workers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for worker in (self.nanny, self.cook):
+                worker.status = 'Booked'
+                worker.save()
+
+    async def test_stream_delivers_matching_events(self):
+        response = await streams.event_stream(AsyncRequestFactory().get('/api/events/', {'profession': 'Cook'}))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        lines = response.streaming_content
+        self.assertTrue((await self.next_event(lines)).startswith('retry:'))
+
+        await sync_to_async(self.book_both_workers)()
+        event_id, event_type, data = (await self.next_event(lines)).strip().splitlines()
+        self.assertEqual(event_type, f'event: {WORKER_STATUS}')
+        self.assertEqual(
+            json.loads(data.removeprefix('data: ')),
+            {'id': int(event_id.removeprefix('id: ')), 'type': WORKER_STATUS, 'worker': self.cook.pk,
+             'status': 'Booked', 'previous': 'Available', 'profession': 'Cook', 'nationality': 'Kenyan'},
+        )
+        self.assertEqual((await asyncio.wait_for(anext(lines), 1)).decode(), ': keep-alive\n\n')
+        await lines.aclose()
+        response.close()
+        self.assertFalse(get_broker().has_subscribers())
+
+        response = await streams.event_stream(AsyncRequestFactory().get('/api/events/', {'profession': 'Pilot'}))
+        self.assertEqual(response.status_code, 400)
+
+    def approve_first_booking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/bookings/status/', {'ids': [self.bookings[0].pk], 'status': 'Approved'},
+                content_type='application/json',
+            )
+
+    async def test_bulk_transition_publishes_events(self):
+        subscription = get_broker().subscribe({'profession': {'Cook'}})
+        try:
+            await sync_to_async(self.approve_first_booking)()
+            events = [await asyncio.wait_for(subscription.get(), 1) for _ in range(3)]
+        finally:
+            subscription.close()
+        self.assertEqual(
+            [(event['type'], event.get('booking'), event['previous'], event['status']) for event in events],
+            [
+                (WORKER_STATUS, None, 'Available', 'Booked'),
+                (BOOKING_STATUS, self.bookings[0].pk, 'Pending', 'Approved'),
+                (BOOKING_STATUS, self.bookings[1].pk, 'Pending', 'Rejected'),
+            ],
+        )
+
+    @override_settings(EVENT_STREAM_QUEUE_SIZE=2)
+    async def test_slow_subscribers_are_dropped_and_reconnects_replay(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe({})
+        for worker in range(3):
+            broker.publish({'type': WORKER_STATUS, 'worker': worker})
+        await asyncio.sleep(0)
+        self.assertIsNone(await subscription.get())
+        self.assertFalse(broker.has_subscribers())
+
+        replay = broker.subscribe({}, last_event_id=1)
+        self.assertEqual([(await replay.get())['id'] for _ in range(2)], [2, 3])
+        self.assertIsNone(await broker.subscribe({}, last_event_id=99).get())
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Fire parallel creates at one worker; only one may reserve it"""
+
+    requests = 200
+    threads = 16
+    # Reads may be routed to replicas, which mirror the test database
+    databases = '__all__'
+
+    def setUp(self):
+        self.worker = Worker.objects.create(
+            name='Contested Worker', passport_number='RACE00001', nationality='Filipino',
+            profession='Nanny', age=30
+        )
+
+    def post_booking(self, number, idempotency_key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': idempotency_key} if idempotency_key else {}
+        try:
+            response = Client().post('/api/bookings/create/', {
+                'worker': self.worker.pk,
+                'full_name': f'Client {number}',
+                'phone_number': '+966501234567',
+            }, **headers)
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_parallel_creates_reserve_worker_once(self):
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            statuses = list(pool.map(self.post_booking, range(self.requests)))
+
+        self.assertEqual(statuses.count(201), 1, Counter(statuses))
+        self.assertEqual(statuses.count(400), self.requests - 1, Counter(statuses))
+        self.assertEqual(BookingRequest.objects.filter(worker=self.worker).count(), 1)
+        self.worker.refresh_from_db()
+        self.assertEqual(self.worker.status, 'Booked')
+
+    def test_parallel_retries_with_one_idempotency_key_create_one_booking(self):
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            statuses = list(pool.map(lambda number: self.post_booking(number, 'retry-key-1'), range(50)))
+
+        self.assertEqual(statuses.count(201), 1, Counter(statuses))
+        self.assertEqual(statuses.count(200), 49, Counter(statuses))
+        self.assertEqual(BookingRequest.objects.filter(idempotency_key='retry-key-1').count(), 1)
+
+
+class BookingUpdateTransactionTests(TransactionTestCase):
+    """Status updates lock and release the worker inside a transaction, as MySQL requires"""
+
+    def setUp(self):
+        self.worker = Worker.objects.create(
+            name='Locked Worker', passport_number='TX00001', nationality='Filipino', profession='Nanny',
+            age=30, status='Booked',
+        )
+        self.booking = BookingRequest.objects.create(
+            worker=self.worker, full_name='Client', phone_number='+966501234567'
+        )
+
+    def test_patch_runs_the_worker_lock_in_a_transaction(self):
+        # SQLite ignores FOR UPDATE, so pretend to support it to get Django's autocommit check
+        with mock.patch.object(connection.features, 'has_select_for_update', True), \
+                mock.patch.object(connection.ops, 'for_update_sql', return_value=''):
+            response = self.client.patch(
+                f'/api/bookings/{self.booking.pk}/', {'status': 'Rejected'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.worker.refresh_from_db()
+            self.assertEqual(self.worker.status, 'Available')
+
+            self.booking.delete()
+            self.worker.refresh_from_db()
+            self.assertEqual(self.worker.status, 'Available')
@@ -0,0 +1,163 @@
+"""
+Bulk booking status changes.
+
+``bulk_transition`` moves many bookings to one status with a handful of
+set-based UPDATEs inside a single transaction, instead of a validation pass
+and ``save()`` per booking. ``update()`` bypasses model signals, so the
+booking rollups are updated here in the same transaction, and the stats and
+response caches refreshed and the status events published once it commits.
+"""
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+from .caching import bump_model_version
+from .events import booking_event, publish_on_commit, worker_event
+from .models import Worker, BookingRequest
+from .rollups import RollupDeltas
+from .stats import invalidate_stats
+
+
+# Bookings that hold their worker
+ACTIVE_BOOKING_STATUSES = ('Pending', 'Approved')
+
+
+def bulk_transition(booking_ids, status):
+    """Move ``booking_ids`` to ``status`` and return ``(results, competing)``.
+
+    ``results`` has one dict per requested id, in request order, with the
+    booking's resulting status and the outcome: ``updated``, ``unchanged``,
+    ``not_found``, or ``conflict`` for an approval whose worker already has
+    an approved booking (or an earlier one in the same request).
+
+    Approving a booking rejects the worker's other pending bookings;
+    ``competing`` lists the ids rejected that way. Those come from imports
+    and the admin, as an API booking holds its worker from creation. The
+    affected workers are then booked or released with ``sync_worker_status``.
+    """
+    booking_ids = list(dict.fromkeys(booking_ids))
+    now = timezone.now()
+    with transaction.atomic():
+        rows = {
+            row['id']: row for row in
+            BookingRequest.objects.select_for_update(of=('self',))
+            .filter(pk__in=booking_ids)
+            .values('id', 'worker_id', 'status', 'created_at', 'approved_at', 'worker__profession', 'worker__nationality')
+        }
+        outcomes = {}
+        for pk in booking_ids:
+            if pk not in rows:
+                outcomes[pk] = 'not_found'
+            elif rows[pk]['status'] == status:
+                outcomes[pk] = 'unchanged'
+
+        approved_workers = set()
+        if status == 'Approved':
+            candidates = sorted(pk for pk in rows if pk not in outcomes)
+            approved_workers = set(
+                BookingRequest.objects
+                .filter(worker_id__in={rows[pk]['worker_id'] for pk in candidates}, status='Approved')
+                .values_list('worker_id', flat=True)
+            )
+            for pk in candidates:
+                worker_id = rows[pk]['worker_id']
+                if worker_id in approved_workers:
+                    outcomes[pk] = 'conflict'
+                else:
+                    approved_workers.add(worker_id)
+
+        updated = [pk for pk in booking_ids if pk not in outcomes]
+        # (booking id, worker id, previous status, new status) of every booking moved
+        moved = [(pk, rows[pk]['worker_id'], rows[pk]['status'], status) for pk in updated]
+        approved_at = now if status == 'Approved' else None
+        deltas = RollupDeltas()
+        for pk in updated:
+            row = rows[pk]
+            worker_group = (row['worker__profession'], row['worker__nationality'])
+            deltas.remove(row['created_at'], row['status'], *worker_group, approved_at=row['approved_at'])
+            deltas.add(row['created_at'], status, *worker_group, approved_at=approved_at)
+            outcomes[pk] = 'updated'
+            row['status'] = status
+        if updated:
+            BookingRequest.objects.filter(pk__in=updated).update(status=status, updated_at=now, approved_at=approved_at)
+
+        competing = []
+        workers = {rows[pk]['worker_id'] for pk in updated}
+        if status == 'Approved' and updated:
+            competing_rows = list(
+                BookingRequest.objects.select_for_update(of=('self',))
+                .filter(worker_id__in=workers, status='Pending')
+                .order_by('pk').values_list('id', 'worker_id', 'created_at', 'worker__profession', 'worker__nationality')
+            )
+            competing = [pk for pk, *_ in competing_rows]
+            for pk, worker_id, created_at, profession, nationality in competing_rows:
+                moved.append((pk, worker_id, 'Pending', 'Rejected'))
+                deltas.remove(created_at, 'Pending', profession, nationality)
+                deltas.add(created_at, 'Rejected', profession, nationality)
+            if competing:
+                BookingRequest.objects.filter(pk__in=competing).update(status='Rejected', updated_at=now)
+                for pk in competing:
+                    if pk in rows:
+                        rows[pk]['status'] = 'Rejected'
+
+        # Approving books the worker; leaving Pending or Approved may release it
+        changed_workers = sync_worker_status(workers, now)
+        deltas.apply()
+        if updated:
+            transaction.on_commit(lambda: _refresh_caches(worker_changed=bool(changed_workers)))
+            publish_on_commit(lambda: _status_events(moved, changed_workers))
+
+    results = [
+        {'id': pk, 'status': rows[pk]['status'] if pk in rows else None, 'result': outcomes[pk]}
+        for pk in booking_ids
+    ]
+    return results, competing
+
+
+def sync_worker_status(worker_ids, now=None, using=None):
+    """Make each worker Booked while it has a pending or approved booking, and Available otherwise.
+
+    Workers On Leave are left alone. Runs one locking SELECT and at most one
+    UPDATE, which bypasses the worker signals like the rest of this module,
+    and returns ``{worker id: previous status}`` of the workers it changed.
+    Callers should hold the transaction that wrote the bookings; one is
+    opened here otherwise, as the row locks need it.
+    """
+    if not worker_ids:
+        return {}
+    now = now or timezone.now()
+    workers = Worker.objects.db_manager(using)
+    holding = BookingRequest.objects.filter(worker=OuterRef('pk'), status__in=ACTIVE_BOOKING_STATUSES)
+    with transaction.atomic(using=using, savepoint=False):
+        rows = (
+            workers.select_for_update().filter(pk__in=worker_ids).exclude(status='On Leave').order_by()
+            .annotate(held=Exists(holding)).values_list('id', 'status', 'held')
+        )
+        changed = {pk: status for pk, status, held in rows if (status == 'Booked') != held}
+        booked = [pk for pk, status in changed.items() if status != 'Booked']
+        if changed:
+            workers.filter(pk__in=changed).update(
+                status=Case(When(pk__in=booked, then=Value('Booked')), default=Value('Available')),
+                updated_at=now,
+            )
+    return changed
+
+
+def _refresh_caches(worker_changed):
+    invalidate_stats()
+    bump_model_version(BookingRequest)
+    if worker_changed:
+        bump_model_version(Worker)
+
+
+def _status_events(moved, changed_workers):
+    """Events for the bookings in ``moved`` and the workers in ``changed_workers`` (id to previous status)"""
+    workers = Worker.objects.only('status', 'profession', 'nationality').in_bulk(
+        {worker_id for _, worker_id, _, _ in moved}
+    )
+    events = [worker_event(workers[pk], previous) for pk, previous in changed_workers.items() if pk in workers]
+    events += [
+        booking_event(pk, workers[worker_id], status, previous)
+        for pk, worker_id, previous, status in moved if worker_id in workers
+    ]
+    return events
@@ -1,19 +1,35 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, streams, views
+
+# List, detail and stats reads can be served by the async ORM under ASGI
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
     # Worker endpoints
-    path('workers/', views.WorkerListView.as_view(), name='worker-list'),
-    path('workers/<int:pk>/', views.WorkerDetailView.as_view(), name='worker-detail'),
+    path('workers/', read_views.WorkerListView.as_view(), name='worker-list'),
+    path('workers/facets/', views.WorkerFacetView.as_view(), name='worker-facets'),
+    path('workers/histograms/', views.WorkerHistogramView.as_view(), name='worker-histograms'),
+    path('workers/changes/', views.WorkerChangeFeedView.as_view(), name='worker-changes'),
+    path('workers/match/', views.WorkerMatchView.as_view(), name='worker-match'),
+    path('workers/export/', views.WorkerExportView.as_view(), name='worker-export'),
+    path('workers/<int:pk>/', read_views.WorkerDetailView.as_view(), name='worker-detail'),
     
     # Booking endpoints
     path('bookings/', views.BookingRequestListView.as_view(), name='booking-list'),
+    path('bookings/export/', views.BookingRequestExportView.as_view(), name='booking-export'),
+    path('bookings/changes/', views.BookingRequestChangeFeedView.as_view(), name='booking-changes'),
     path('bookings/create/', views.BookingRequestCreateView.as_view(), name='booking-create'),
     path('bookings/<int:pk>/', views.BookingRequestDetailView.as_view(), name='booking-detail'),
+    path('bookings/status/', views.BookingStatusTransitionView.as_view(), name='booking-bulk-status'),
     
     # Statistics endpoints
-    path('stats/workers/', views.worker_stats, name='worker-stats'),
-    path('stats/bookings/', views.booking_stats, name='booking-stats'),
+    path('stats/workers/', read_views.worker_stats, name='worker-stats'),
+    path('stats/bookings/', read_views.booking_stats, name='booking-stats'),
+    path('stats/bookings/series/', views.booking_series, name='booking-series'),
+    
+    # Status change stream (ASGI only)
+    path('events/', streams.event_stream, name='event-stream'),
     
     # Filter choices endpoint
     path('choices/', views.filter_choices, name='filter-choices'),
@@ -1,53 +1,193 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import IntegrityError
 from django.db.models import Q
+from .caching import ConditionalCacheMixin
+from .changes import decode_cursor, read_changes
+from .exports import CSVRenderer, JSONLinesRenderer, WorkerExporter, BookingExporter
+from .facets import compute_facets, compute_histograms
+from .fastpath import FastListMixin
+from .matching import get_match_index
+from .filters import WorkerFilter, WorkerSearchFilter
+from .mixins import QueryBudgetMixin, SparseFieldsetMixin
 from .models import Worker, BookingRequest
+from .search import SEARCH_FIELDS
+from .tags import filter_by_tags
+from .transitions import bulk_transition
 from .serializers import (
     WorkerSerializer, WorkerListSerializer, 
-    BookingRequestSerializer, BookingRequestCreateSerializer
+    BookingRequestSerializer, BookingRequestCreateSerializer,
+    BookingStatusTransitionSerializer, BookingSeriesQuerySerializer, WorkerMatchQuerySerializer
 )
+from .rollups import booking_series as get_booking_series
+from .stats import get_worker_stats, get_booking_stats
 
 
-class WorkerListView(generics.ListAPIView):
+class WorkerListView(QueryBudgetMixin, ConditionalCacheMixin, SparseFieldsetMixin, FastListMixin, generics.ListAPIView):
     """List all workers with filtering and search capabilities"""
     queryset = Worker.objects.all()
+    query_budget = 2
+    cache_models = [Worker]
     serializer_class = WorkerListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['profession', 'nationality', 'status', 'religion', 'marital_status']
-    search_fields = ['name', 'profession', 'nationality', 'skills', 'languages_spoken']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, WorkerSearchFilter]
+    filterset_class = WorkerFilter
+    search_fields = SEARCH_FIELDS
     ordering_fields = ['name', 'age', 'created_at', 'experience_years', 'salary_expectation']
     ordering = ['-created_at']
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
-        # Custom filtering
-        age_min = self.request.query_params.get('age_min')
-        age_max = self.request.query_params.get('age_max')
-        experience_min = self.request.query_params.get('experience_min')
-        
-        if age_min:
-            queryset = queryset.filter(age__gte=age_min)
-        if age_max:
-            queryset = queryset.filter(age__lte=age_max)
-        if experience_min:
-            queryset = queryset.filter(experience_years__gte=experience_min)
+        # Comma-separated tags; languages_match/skills_match=all requires every one
+        for param, relation in (('languages', 'language_tags'), ('skills', 'skill_tags')):
+            values = self.request.query_params.get(param)
+            if values:
+                match_all = self.request.query_params.get(f'{param}_match') == 'all'
+                queryset = filter_by_tags(queryset, relation, values.split(','), match_all)
             
         return queryset
 
 
-class WorkerDetailView(generics.RetrieveAPIView):
+class WorkerFacetView(WorkerListView):
+    """Counts per filter value for the workers matching the current filters and search"""
+    query_budget = 1
+    pagination_class = None
+    cache_ignored_params = ['page', 'cursor', 'count', 'ordering', 'fields', 'exclude']
+
+    def list(self, request, *args, **kwargs):
+        return Response(compute_facets(self.filter_queryset(self.get_queryset())))
+
+
+class WorkerHistogramView(WorkerFacetView):
+    """Bucketed counts and bounds of the numeric fields for the workers matching the current filters"""
+
+    def list(self, request, *args, **kwargs):
+        return Response(compute_histograms(self.filter_queryset(self.get_queryset())))
+
+
+class ExportMixin:
+    """Stream the whole filtered list as CSV (default) or JSON Lines via ``?format=``"""
+    renderer_classes = [CSVRenderer, JSONLinesRenderer]
+    pagination_class = None
+    # Rows are read while the response streams, after the view has returned
+    query_budget = None
+    exporter_class = None
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        exporter = self.exporter_class()
+        response = StreamingHttpResponse(
+            exporter.stream(queryset, renderer.format),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exporter.filename}.{renderer.format}"'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if isinstance(response, Response):
+            # Errors are reported as JSON whichever export format was asked for
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class WorkerExportView(ExportMixin, WorkerListView):
+    """Export the workers matching the list filters"""
+    exporter_class = WorkerExporter
+
+
+class ChangeFeedMixin:
+    """Rows saved and ids deleted after the ``?since=`` cursor, oldest first; see api.changes"""
+    since_query_param = 'since'
+    limit_query_param = 'limit'
+    default_limit = 100
+    max_limit = 1000
+    pagination_class = None
+
+    def get_limit(self, request):
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({self.limit_query_param: ['Must be a positive integer.']})
+        return min(limit, self.max_limit)
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get(self.since_query_param)
+        try:
+            cursor = decode_cursor(since) if since else None
+        except ValueError:
+            raise ValidationError({self.since_query_param: ['Invalid cursor']})
+
+        page = read_changes(self.get_queryset(), cursor, self.get_limit(request))
+        return Response({
+            'changed': self.get_serializer(page.changed, many=True).data,
+            'deleted': page.deleted,
+            'cursor': page.cursor,
+            'has_more': page.has_more,
+            'next': replace_query_param(request.build_absolute_uri(), self.since_query_param, page.cursor),
+        })
+
+
+class WorkerChangeFeedView(QueryBudgetMixin, ChangeFeedMixin, generics.ListAPIView):
+    """Worker changes for clients that keep a local copy of the worker pool"""
+    queryset = Worker.objects.all()
+    query_budget = 2
+    serializer_class = WorkerSerializer
+
+
+class WorkerMatchView(QueryBudgetMixin, generics.GenericAPIView):
+    """Available workers ranked against a client's requirements; see api.matching"""
+    queryset = Worker.objects.all()
+    # Catching up with the change feed, then loading the top workers; the
+    # first request of a process also builds the index and runs over
+    query_budget = 3
+    serializer_class = WorkerListSerializer
+
+    def get(self, request, *args, **kwargs):
+        query = WorkerMatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        matches, candidates = get_match_index().match(**query.validated_data)
+        workers = self.get_queryset().in_bulk([worker_id for worker_id, _ in matches])
+        # A worker deleted since the index caught up is left out
+        matches = [(workers[worker_id], score) for worker_id, score in matches if worker_id in workers]
+        data = self.get_serializer([worker for worker, _ in matches], many=True).data
+        return Response({
+            'count': candidates,
+            'results': [{**item, 'match_score': round(score, 4)} for item, (_, score) in zip(data, matches)],
+        })
+
+
+class WorkerDetailView(QueryBudgetMixin, ConditionalCacheMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     """Retrieve a specific worker by ID"""
     queryset = Worker.objects.all()
+    query_budget = 1
+    cache_models = [Worker]
     serializer_class = WorkerSerializer
 
 
-class BookingRequestListView(generics.ListAPIView):
+class BookingRequestListView(QueryBudgetMixin, SparseFieldsetMixin, FastListMixin, generics.ListAPIView):
     """List all booking requests (admin only)"""
-    queryset = BookingRequest.objects.all()
+    queryset = BookingRequest.objects.select_related('worker')
+    query_budget = 2
     serializer_class = BookingRequestSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'worker__profession', 'worker__nationality']
@@ -55,18 +195,64 @@ class BookingRequestListView(generics.ListAPIView):
     ordering = ['-created_at']
 
 
-class BookingRequestCreateView(generics.CreateAPIView):
-    """Create a new booking request"""
+class BookingRequestExportView(ExportMixin, BookingRequestListView):
+    """Export the booking requests matching the list filters"""
+    exporter_class = BookingExporter
+
+
+class BookingRequestChangeFeedView(QueryBudgetMixin, ChangeFeedMixin, generics.ListAPIView):
+    """Booking request changes for clients that keep a local copy"""
+    queryset = BookingRequest.objects.select_related('worker')
+    query_budget = 2
+    serializer_class = BookingRequestSerializer
+
+
+class BookingRequestCreateView(QueryBudgetMixin, generics.CreateAPIView):
+    """Create a new booking request, reserving the worker.
+
+    Clients may send an ``Idempotency-Key`` header; repeating a request with
+    the same key returns the booking it created (200) instead of a new one.
+    """
     queryset = BookingRequest.objects.all()
+    query_budget = 9
     serializer_class = BookingRequestCreateSerializer
+    idempotency_header = 'Idempotency-Key'
     
-    def perform_create(self, serializer):
-        serializer.save()
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header) or None
+        if key is not None:
+            if len(key) > BookingRequest._meta.get_field('idempotency_key').max_length:
+                raise ValidationError({self.idempotency_header: ['Ensure this value has at most 64 characters.']})
+            existing = BookingRequest.objects.filter(idempotency_key=key).first()
+            if existing is not None:
+                return self.replay(existing)
+
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+            booking = serializer.save(idempotency_key=key)
+        except (ValidationError, IntegrityError):
+            # A concurrent request with the same key may have won the race
+            existing = key and BookingRequest.objects.filter(idempotency_key=key).first()
+            if not existing:
+                raise
+            return self.replay(existing)
 
+        if getattr(booking, 'replayed', False):
+            return self.replay(booking)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class BookingRequestDetailView(generics.RetrieveUpdateAPIView):
+    def replay(self, booking):
+        return Response(self.get_serializer(booking).data, status=status.HTTP_200_OK)
+
+
+class BookingRequestDetailView(QueryBudgetMixin, SparseFieldsetMixin, generics.RetrieveUpdateAPIView):
     """Retrieve and update a specific booking request"""
-    queryset = BookingRequest.objects.all()
+    queryset = BookingRequest.objects.select_related('worker')
+    # Writes that release or book the worker add its SELECT and UPDATE, and
+    # their transaction is a SAVEPOINT/RELEASE pair when nested
+    query_budget = {'GET': 1, 'PUT': 8, 'PATCH': 8}
     serializer_class = BookingRequestSerializer
     
     def get_serializer_class(self):
@@ -76,56 +262,57 @@ class BookingRequestDetailView(generics.RetrieveUpdateAPIView):
         return BookingRequestSerializer
 
 
+class BookingStatusTransitionView(QueryBudgetMixin, generics.GenericAPIView):
+    """Move a list of booking requests to one status in a single transaction.
+
+    Approving also books the worker and rejects its other pending requests.
+    """
+    query_budget = 10
+    serializer_class = BookingStatusTransitionSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status_value = serializer.validated_data['status']
+        results, competing = bulk_transition(serializer.validated_data['ids'], status_value)
+        return Response({'status': status_value, 'results': results, 'rejected_competing': competing})
+
+
 @api_view(['GET'])
 def worker_stats(request):
     """Get worker statistics for dashboard"""
-    total_workers = Worker.objects.count()
-    available_workers = Worker.objects.filter(status='Available').count()
-    booked_workers = Worker.objects.filter(status='Booked').count()
-    on_leave_workers = Worker.objects.filter(status='On Leave').count()
-    
-    profession_stats = {}
-    for profession, _ in Worker.PROFESSION_CHOICES:
-        profession_stats[profession] = Worker.objects.filter(profession=profession).count()
-    
-    nationality_stats = {}
-    for nationality, _ in Worker.NATIONALITY_CHOICES:
-        nationality_stats[nationality] = Worker.objects.filter(nationality=nationality).count()
-    
-    return Response({
-        'total_workers': total_workers,
-        'available_workers': available_workers,
-        'booked_workers': booked_workers,
-        'on_leave_workers': on_leave_workers,
-        'profession_stats': profession_stats,
-        'nationality_stats': nationality_stats
-    })
+    return Response(get_worker_stats())
 
 
 @api_view(['GET'])
 def booking_stats(request):
     """Get booking request statistics"""
-    total_requests = BookingRequest.objects.count()
-    pending_requests = BookingRequest.objects.filter(status='Pending').count()
-    approved_requests = BookingRequest.objects.filter(status='Approved').count()
-    rejected_requests = BookingRequest.objects.filter(status='Rejected').count()
-    
-    return Response({
-        'total_requests': total_requests,
-        'pending_requests': pending_requests,
-        'approved_requests': approved_requests,
-        'rejected_requests': rejected_requests
-    })
+    return Response(get_booking_stats())
+
+
+@api_view(['GET'])
+def booking_series(request):
+    """Booking requests per day, week or month, read from the daily rollups"""
+    query = BookingSeriesQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    return Response(get_booking_series(**query.validated_data))
+
+
+FILTER_CHOICES = {
+    'professions': Worker.PROFESSION_CHOICES,
+    'nationalities': Worker.NATIONALITY_CHOICES,
+    'religions': Worker.RELIGION_CHOICES,
+    'marital_statuses': Worker.MARITAL_STATUS_CHOICES,
+    'worker_statuses': Worker.STATUS_CHOICES,
+    'booking_statuses': BookingRequest.STATUS_CHOICES
+}
+# The choices only change with a deploy, so their hash is a stable ETag
+FILTER_CHOICES_ETAG = hashlib.sha1(json.dumps(FILTER_CHOICES).encode('utf-8')).hexdigest()
 
 
+@cache_control(public=True, max_age=settings.FILTER_CHOICES_MAX_AGE)
+@etag(lambda request: FILTER_CHOICES_ETAG)
 @api_view(['GET'])
 def filter_choices(request):
     """Get all available filter choices for frontend"""
-    return Response({
-        'professions': Worker.PROFESSION_CHOICES,
-        'nationalities': Worker.NATIONALITY_CHOICES,
-        'religions': Worker.RELIGION_CHOICES,
-        'marital_statuses': Worker.MARITAL_STATUS_CHOICES,
-        'worker_statuses': Worker.STATUS_CHOICES,
-        'booking_statuses': BookingRequest.STATUS_CHOICES
-    })
+    return Response(FILTER_CHOICES)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.PrimaryStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -84,6 +86,17 @@ if config('USE_SQLITE', default=False, cast=bool):
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # SQLite ignores select_for_update(); taking the write lock when a
+                # transaction starts serializes booking reservations instead
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # A file rather than shared-cache memory, so the concurrent booking
+            # tests wait on locks instead of failing with "table is locked"
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 else:
@@ -98,6 +111,88 @@ else:
         }
     }
 
+# Read replicas for the api models: database file paths when using SQLite
+# (e.g. a copy of db.sqlite3 to try routing locally), otherwise MySQL hosts.
+# Reads go to a replica, writes to default; see api/routers.py
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+REPLICA_DATABASES = []
+for index, replica in enumerate(DATABASE_REPLICAS, start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST': replica,
+        # Tests read what they write, so replicas share the test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Use a shared backend (Redis, Memcached) in production so every process sees
+# the same model version stamps
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='workershub'),
+    }
+}
+
+# Seconds before cached dashboard counts are recomputed from the database
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a rendered worker list/detail response stays in the cache
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=600, cast=int)
+
+# Browser/CDN max-age for /api/choices/, which only changes with a deploy
+FILTER_CHOICES_MAX_AGE = config('FILTER_CHOICES_MAX_AGE', default=86400, cast=int)
+
+
+# What QueryBudgetMixin does when a view runs more queries than it declares:
+# 'log', 'raise' or 'off'
+QUERY_BUDGET_ACTION = config('QUERY_BUDGET_ACTION', default='log')
+
+# Serve worker list/detail and stats from the async views in api.async_views;
+# only worthwhile when running under ASGI
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+# Build worker and booking list pages from values() rows instead of running
+# the serializer per row; the output is the same either way
+FAST_LIST_SERIALIZATION = config('FAST_LIST_SERIALIZATION', default=True, cast=bool)
+
+# Seconds the change feed rewinds its final cursor by, so rows from
+# transactions that commit late are still picked up on the next poll
+CHANGE_FEED_SETTLE_SECONDS = config('CHANGE_FEED_SETTLE_SECONDS', default=5, cast=int)
+
+# Broker class fanning status change events out to /api/events/ streams; the
+# in-process one only reaches clients connected to the same process
+EVENT_BROKER = config('EVENT_BROKER', default='api.events.InProcessBroker')
+
+# Events a stream may fall behind by before it is told to resync
+EVENT_STREAM_QUEUE_SIZE = config('EVENT_STREAM_QUEUE_SIZE', default=100, cast=int)
+
+# Recent events kept for clients reconnecting with Last-Event-ID
+EVENT_REPLAY_SIZE = config('EVENT_REPLAY_SIZE', default=1000, cast=int)
+
+# Seconds between keep-alive comments on an idle stream, and the reconnect
+# delay suggested to clients
+EVENT_STREAM_HEARTBEAT_SECONDS = config('EVENT_STREAM_HEARTBEAT_SECONDS', default=15, cast=float)
+EVENT_STREAM_RETRY_MS = config('EVENT_STREAM_RETRY_MS', default=3000, cast=int)
+
+# Dotted path to an api.search backend; unset picks MySQL FULLTEXT or SQLite FTS5
+WORKER_SEARCH_BACKEND = config('WORKER_SEARCH_BACKEND', default='')
+
+# Per-endpoint latency, query and response size histograms, served at /metrics
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Log requests slower than this many seconds with the SQL they ran; 0 disables
+SLOW_REQUEST_SECONDS = config('SLOW_REQUEST_SECONDS', default=0, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,9 +246,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.StandardPagination',
     'PAGE_SIZE': 20
 }
 